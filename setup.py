@@ -13,11 +13,13 @@ setup(
         "tqdm>=4.66.0",
         "plotly>=5.17.0",
         "pandas>=2.1.0",
+        "numpy>=1.24.0",
+        "orjson>=3.9.0",
         "python-dotenv>=1.0.0",
         "beautifulsoup4>=4.12.0",
         "lxml>=4.9.0",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
 )
 
 
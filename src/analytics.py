@@ -1,14 +1,53 @@
 """Analytics and visualization generation"""
 
-import json
+import hashlib
 from typing import Dict, List
-from collections import defaultdict, Counter
-from datetime import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from datetime import datetime, timezone
+import numpy as np
+import orjson
 import pandas as pd
+import plotly
 import plotly.graph_objects as go
-from tqdm import tqdm
 
-from src.config import ANALYTICS_JSON, ANALYTICS_CSV, SANKEY_HTML
+from src.config import ANALYTICS_JSON, ANALYTICS_CSV, SANKEY_HTML, SANKEY_PLOTLYJS
+
+# Status vocabulary produced by EmailClassifier
+KNOWN_STATUSES = (
+    "applied",
+    "confirmation",
+    "interview_1",
+    "interview_2",
+    "interview_3",
+    "interview_4",
+    "interview_5",
+    "offer",
+    "accepted",
+    "rejected",
+    "withdrew",
+    "no_reply",
+    "not_job_related",
+)
+
+# Statuses that do not count as job applications
+EXCLUDED_STATUSES = frozenset({"no_reply", "not_job_related"})
+
+# Terminal statuses in increasing precedence when picking a company's final status
+FINAL_STATUS_PRIORITY = ("rejected", "withdrew", "offer", "accepted")
+
+# Company outcome codes used to bucket companies in the Sankey diagram
+OUTCOME_GHOSTED = 0
+OUTCOME_REJECTED = 1
+OUTCOME_WITHDREW = 2
+OUTCOME_DECLINED_OFFER = 3
+OUTCOME_ACCEPTED = 4
+
+# Time zone keys for application dates without a UTC offset, and for values that are
+# not datetime objects at all (missing dates and strings left unparsed)
+_NAIVE = object()
+_NOT_DATETIME = object()
 
 
 class AnalyticsGenerator:
@@ -16,262 +55,333 @@ class AnalyticsGenerator:
     
     def __init__(self, emails: List[Dict]):
         self.emails = emails
-        self.stats = self._calculate_stats()
+    
+    @cached_property
+    def _df(self) -> pd.DataFrame:
+        """DataFrame with one row per email holding the fields used for analytics"""
+        df = pd.DataFrame(self.emails, columns=["company", "status", "date", "subject", "confidence"])
+        df = df.fillna({
+            "company": "Unknown",
+            "status": "no_reply",
+            "subject": "",
+            "confidence": 0.0,
+        })
+        # Company and status repeat heavily, so store them as integer-coded categoricals
+        df = df.astype({"company": "category", "status": "category", "confidence": np.float64})
+        
+        # Parse the interview stage once per distinct status and spread it over the rows
+        status = df["status"].cat
+        stages = pd.to_numeric(
+            pd.Series(status.categories).str.extract(r"^interview_(\d+)", expand=False),
+            errors="coerce",
+        ).fillna(0).astype(np.int32).to_numpy()
+        df["interview_stage"] = stages[status.codes.to_numpy()]
+        return df
+    
+    @cached_property
+    def _timestamps(self) -> pd.Series:
+        """Email dates as one UTC datetime64 column (NaT where missing or unparseable)"""
+        return pd.to_datetime(self._df["date"], utc=True, errors="coerce")
+    
+    @cached_property
+    def _applications(self) -> pd.DataFrame:
+        """Application rows as written to the CSV, with ISO formatted dates"""
+        df = self._df
+        return df[["company", "status", "date", "subject", "confidence"]].assign(
+            date=pd.Series(self._iso_dates(), index=df.index, dtype=object)
+        )
+    
+    def _iso_dates(self) -> np.ndarray:
+        """
+        Email dates as isoformat() writes them, formatted with numpy once per UTC offset
+        
+        Dates keep their own offset (or lack of one) and microseconds, as the summary's
+        date range reports them, and dates left unparsed stay as they are. Dates numpy
+        cannot format the same way, such as ones in a time zone with daylight saving
+        time, are formatted one at a time.
+        """
+        column = self._df["date"]
+        utc = self._timestamps.to_numpy(dtype="datetime64[us]")
+        iso = np.empty(len(column), dtype=object)
+        one_at_a_time = np.zeros(len(column), dtype=bool)
+        
+        # Group the rows by time zone, looking at each date's tzinfo only
+        if pd.api.types.is_datetime64_any_dtype(column):
+            # pandas already converted the dates to its one time zone (or none)
+            zones = np.where(column.isna().to_numpy(), _NOT_DATETIME, column.dt.tz or _NAIVE)
+        else:
+            zones = [
+                (date.tzinfo or _NAIVE) if isinstance(date, datetime) else _NOT_DATETIME
+                for date in column
+            ]
+        zones = pd.Series(zones, dtype=object)
+        for zone, rows in zones.groupby(zones, sort=False).indices.items():
+            if zone is _NOT_DATETIME or (zone is not _NAIVE and not isinstance(zone, timezone)):
+                one_at_a_time[rows] = True
+                continue
+            # Naive dates were parsed as UTC, so their UTC time is their own
+            local = utc[rows] if zone is _NAIVE else utc[rows] + np.timedelta64(zone.utcoffset(None))
+            # Dates outside the datetime64 range were not parsed
+            unparsed = np.isnat(local)
+            one_at_a_time[rows[unparsed]] = True
+            rows, local = rows[~unparsed], local[~unparsed]
+            # isoformat() leaves out the microseconds when there are none
+            text = np.where(
+                local.astype("datetime64[s]") == local,
+                np.datetime_as_string(local, unit="s"),
+                np.datetime_as_string(local, unit="us"),
+            )
+            offset = "" if zone is _NAIVE else datetime(2000, 1, 1, tzinfo=zone).isoformat()[19:]
+            iso[rows] = np.char.add(text, offset)
+        
+        for row in np.flatnonzero(one_at_a_time):
+            date = column.iat[row]
+            iso[row] = (
+                date.isoformat() if isinstance(date, datetime) and pd.notna(date)
+                else date if isinstance(date, str) else None
+            )
+        return iso
+    
+    @cached_property
+    def _job_related(self) -> np.ndarray:
+        """Boolean row mask of emails whose status is not excluded from applications"""
+        # Test membership once per category, then spread the result over the row codes
+        status = self._df["status"].cat
+        excluded = status.categories.isin(EXCLUDED_STATUSES)
+        return ~excluded[status.codes.to_numpy()]
+    
+    @cached_property
+    def stats(self) -> Dict:
+        """Statistics from classified emails, calculated on first access"""
+        return self._calculate_stats()
+    
+    @cached_property
+    def summary(self) -> Dict:
+        """Summary statistics, generated on first access"""
+        return self.generate_summary()
     
     def _calculate_stats(self) -> Dict:
         """Calculate statistics from classified emails"""
-        stats = {
+        print("Calculating statistics...")
+        df = self._df
+        
+        # Per-company status counts, without keeping a list of every status
+        by_company = {}
+        status_counts = df.groupby(["company", "status"], sort=False, observed=True).size()
+        for (company, status), count in status_counts.items():
+            entry = by_company.get(company)
+            if entry is None:
+                entry = by_company[company] = {"count": 0, "statuses": {}}
+            entry["count"] += int(count)
+            entry["statuses"][status] = int(count)
+        
+        # Compare dates as one UTC datetime64 column, but report the original values
+        earliest = latest = None
+        timestamps = self._timestamps
+        if timestamps.notna().any():
+            earliest = df["date"].iat[timestamps.argmin()]
+            latest = df["date"].iat[timestamps.argmax()]
+        
+        return {
             "total_emails": len(self.emails),
-            "by_status": Counter(),
-            "by_company": defaultdict(lambda: {"count": 0, "statuses": []}),
-            "date_range": {"earliest": None, "latest": None},
-            "applications": [],
+            "by_status": self._count_statuses(df["status"]),
+            "by_company": by_company,
+            "date_range": {"earliest": earliest, "latest": latest},
         }
-        
-        print("Calculating statistics...")
-        error_count = 0
-        try:
-            for email_data in tqdm(self.emails, desc="Analyzing emails", unit="email"):
-                try:
-                    status = email_data.get("status", "no_reply")
-                    company = email_data.get("company", "Unknown")
-                    date = email_data.get("date")
-                    
-                    stats["by_status"][status] += 1
-                    stats["by_company"][company]["count"] += 1
-                    stats["by_company"][company]["statuses"].append(status)
-                    
-                    if date:
-                        if not stats["date_range"]["earliest"] or date < stats["date_range"]["earliest"]:
-                            stats["date_range"]["earliest"] = date
-                        if not stats["date_range"]["latest"] or date > stats["date_range"]["latest"]:
-                            stats["date_range"]["latest"] = date
-                    
-                    stats["applications"].append({
-                        "company": company,
-                        "status": status,
-                        "date": date.isoformat() if date else None,
-                        "subject": email_data.get("subject", ""),
-                        "confidence": email_data.get("confidence", 0.0)
-                    })
-                except Exception as e:
-                    error_count += 1
-                    if error_count <= 5:
-                        print(f"\n[WARNING] Error processing email for stats: {e}")
-                    continue
-        except KeyboardInterrupt:
-            print(f"\n[INFO] Statistics calculation interrupted by user")
-        
-        if error_count > 0:
-            print(f"[WARNING] {error_count} emails had errors during statistics calculation")
-        
-        return stats
+    
+    @staticmethod
+    def _count_statuses(status: pd.Series) -> Counter:
+        """Count statuses with one bincount over their positions in the known status vocabulary"""
+        # Map each category to its vocabulary position once, then translate the row codes
+        status = status.astype("category")
+        positions = pd.Index(KNOWN_STATUSES).get_indexer(status.cat.categories)
+        codes = positions[status.cat.codes.to_numpy()]
+        counts = np.bincount(codes[codes >= 0], minlength=len(KNOWN_STATUSES))
+        by_status = Counter({
+            name: int(count) for name, count in zip(KNOWN_STATUSES, counts) if count
+        })
+        
+        # Statuses outside the known vocabulary are rare; count them by value
+        unknown = status[codes < 0]
+        if not unknown.empty:
+            by_status.update(unknown.astype(object).value_counts(sort=False).to_dict())
+        
+        return by_status
     
     def calculate_accuracy(self) -> float:
         """Calculate classification accuracy based on confidence scores"""
-        if not self.emails:
+        return self._accuracy_percentage(self._df["confidence"].to_numpy(dtype=np.float64))
+    
+    @staticmethod
+    def _accuracy_percentage(confidence: np.ndarray) -> float:
+        """Percentage of confidence scores above 0.5, in one vectorized reduction"""
+        if confidence.size == 0:
             return 0.0
         
-        total_confidence = sum(email.get("confidence", 0.0) for email in self.emails)
-        average_confidence = total_confidence / len(self.emails)
-        
-        # Convert average confidence to percentage
         # Emails with confidence > 0.5 are considered "accurate"
-        high_confidence_count = sum(
-            1 for email in self.emails 
-            if email.get("confidence", 0.0) > 0.5
-        )
+        accuracy_percentage = (confidence > 0.5).mean() * 100
         
-        accuracy_percentage = (high_confidence_count / len(self.emails)) * 100
-        
-        return round(accuracy_percentage, 2)
+        return round(float(accuracy_percentage), 2)
     
     def generate_summary(self) -> Dict:
         """Generate summary statistics"""
-        # Exclude non-job emails from application count
-        excluded_statuses = {"no_reply", "not_job_related"}
-        
-        # Calculate total applications (exclude no_reply and not_job_related)
-        total_applications = sum(
-            count for status, count in self.stats["by_status"].items() 
-            if status not in excluded_statuses
-        )
+        # Single pass over the status counts: total applications
+        # (excluding no_reply and not_job_related) and interview stages
+        status_breakdown = dict(self.stats["by_status"])
+        total_applications = 0
+        interviews_count = 0
+        for status, count in status_breakdown.items():
+            if status in EXCLUDED_STATUSES:
+                continue
+            total_applications += count
+            if status.startswith("interview_"):
+                interviews_count += count
         
-        # Use applied + confirmation as initial applications
-        applied_count = self.stats["by_status"].get("applied", 0)
-        confirmation_count = self.stats["by_status"].get("confirmation", 0)
+        # Calculate accuracy and company count only for job-related emails
+        df = self._df
+        job_related = self._job_related
+        accuracy = self._accuracy_percentage(df["confidence"].to_numpy(dtype=np.float64)[job_related])
         
-        # Calculate accuracy only for job-related emails
-        job_related_emails = [
-            email for email in self.emails 
-            if email.get("status") not in excluded_statuses
-        ]
-        if job_related_emails:
-            accuracy = self._calculate_accuracy_for_emails(job_related_emails)
-        else:
-            accuracy = 0.0
+        earliest = self.stats["date_range"]["earliest"]
+        latest = self.stats["date_range"]["latest"]
         
         summary = {
             "total_applications": total_applications,
-            "status_breakdown": dict(self.stats["by_status"]),
-            "total_companies": len([c for c, data in self.stats["by_company"].items() 
-                                    if any(s not in excluded_statuses for s in data.get("statuses", []))]),
+            "status_breakdown": status_breakdown,
+            "total_companies": df["company"][job_related].nunique(),
             "date_range": {
-                "earliest": self.stats["date_range"]["earliest"].isoformat() 
-                    if self.stats["date_range"]["earliest"] else None,
-                "latest": self.stats["date_range"]["latest"].isoformat() 
-                    if self.stats["date_range"]["latest"] else None,
+                "earliest": earliest.isoformat() if earliest else None,
+                "latest": latest.isoformat() if latest else None,
             },
-            "rejected_count": self.stats["by_status"].get("rejected", 0),
-            "offers_count": self.stats["by_status"].get("offer", 0),
-            "accepted_count": self.stats["by_status"].get("accepted", 0),
-            "interviews_count": sum(
-                count for status, count in self.stats["by_status"].items() 
-                if status.startswith("interview_")
-            ),
-            "withdrew_count": self.stats["by_status"].get("withdrew", 0),
-            "no_reply_count": self.stats["by_status"].get("no_reply", 0),
-            "not_job_related_count": self.stats["by_status"].get("not_job_related", 0),
-            "applied_count": applied_count,
-            "confirmation_count": confirmation_count,
+            "rejected_count": status_breakdown.get("rejected", 0),
+            "offers_count": status_breakdown.get("offer", 0),
+            "accepted_count": status_breakdown.get("accepted", 0),
+            "interviews_count": interviews_count,
+            "withdrew_count": status_breakdown.get("withdrew", 0),
+            "no_reply_count": status_breakdown.get("no_reply", 0),
+            "not_job_related_count": status_breakdown.get("not_job_related", 0),
+            # Use applied + confirmation as initial applications
+            "applied_count": status_breakdown.get("applied", 0),
+            "confirmation_count": status_breakdown.get("confirmation", 0),
             "accuracy_percentage": accuracy,
         }
         return summary
     
-    def _calculate_accuracy_for_emails(self, emails: List[Dict]) -> float:
-        """Calculate accuracy for a specific set of emails"""
-        if not emails:
-            return 0.0
-        
-        high_confidence_count = sum(
-            1 for email in emails 
-            if email.get("confidence", 0.0) > 0.5
+    def _get_company_flow(self) -> pd.DataFrame:
+        """
+        Determine the flow for each company based on all their emails
+        
+        Returns:
+            DataFrame indexed by company with the highest interview stage reached,
+            the final status and one flag per terminal status seen
+        """
+        df = self._df
+        status = df["status"]
+        companies = df["company"].cat.categories
+        company_codes = df["company"].cat.codes.to_numpy()
+        status_codes = status.cat.codes.to_numpy()
+        
+        # Track highest interview stage
+        highest_interview = np.zeros(len(companies), dtype=np.int32)
+        np.maximum.at(highest_interview, company_codes, df["interview_stage"].to_numpy())
+        
+        flows = pd.DataFrame({"highest_interview": highest_interview}, index=companies.rename("company"))
+        
+        # Flag companies with at least one email of each terminal status
+        for name in ("offer", "accepted", "rejected", "withdrew"):
+            code = status.cat.categories.get_indexer([name])[0]
+            seen = np.bincount(company_codes[status_codes == code], minlength=len(companies))
+            flows[f"has_{name}"] = seen > 0
+        
+        # Track final status (priority order: accepted > offer > withdrew > rejected > interview > applied)
+        # Rank every status once, then keep the highest rank seen per company (0 = no terminal status)
+        ranked = pd.Index(("",) + FINAL_STATUS_PRIORITY)
+        ranks = np.maximum(ranked.get_indexer(status.cat.categories), 0).astype(np.int8)
+        best_rank = np.zeros(len(companies), dtype=np.int8)
+        np.maximum.at(best_rank, company_codes, ranks[status_codes])
+        
+        final_status = ranked.to_numpy(dtype=object)[best_rank]
+        no_terminal = best_rank == 0
+        final_status[no_terminal] = np.where(
+            highest_interview[no_terminal] > 0,
+            "interview_" + highest_interview[no_terminal].astype(str).astype(object),
+            "no_reply",
         )
+        flows["final_status"] = final_status
         
-        accuracy_percentage = (high_confidence_count / len(emails)) * 100
-        return round(accuracy_percentage, 2)
+        return flows
+    
+    @cached_property
+    def company_flows(self) -> pd.DataFrame:
+        """Per-company flow (see _get_company_flow), computed on first access"""
+        return self._get_company_flow()
     
-    def _get_company_flow(self) -> Dict[str, Dict]:
-        """Determine the flow for each company based on all their emails"""
-        company_flows = {}
+    @cached_property
+    def flow_counts(self) -> Dict:
+        """Number of companies per Sankey outcome, computed on first access"""
+        # Count companies by their actual flow outcome
+        # The *_from_interview entries are arrays indexed by interview stage (index 0 unused)
+        flow_counts = {
+            "rejected_from_interview": None,  # stage -> count (rejected after this stage)
+            "rejected_direct": 0,  # rejected without interview
+            "withdrew_from_interview": None,  # stage -> count
+            "withdrew_direct": 0,
+            "ghosted_from_interview": None,  # stage -> count (ghosted after this stage)
+            "ghosted_direct": 0,  # ghosted without interview
+            "offer": 0,
+            "accepted": 0,
+            "declined_offer": 0,
+        }
         
-        for email_data in self.emails:
-            company = email_data.get("company", "Unknown")
-            status = email_data.get("status", "no_reply")
-            
-            if company not in company_flows:
-                company_flows[company] = {
-                    "highest_interview": 0,
-                    "final_status": "no_reply",
-                    "has_offer": False,
-                    "has_accepted": False,
-                    "has_rejected": False,
-                    "has_withdrew": False,
-                }
-            
-            flow = company_flows[company]
-            
-            # Track highest interview stage
-            if status.startswith("interview_"):
-                try:
-                    stage_num = int(status.split("_")[1])
-                    flow["highest_interview"] = max(flow["highest_interview"], stage_num)
-                except:
-                    pass
-            
-            # Track final status (priority order: accepted > offer > withdrew > rejected > interview > applied)
-            if status == "accepted":
-                flow["has_accepted"] = True
-                flow["final_status"] = "accepted"
-            elif status == "offer" and flow["final_status"] != "accepted":
-                flow["has_offer"] = True
-                flow["final_status"] = "offer"
-            elif status == "withdrew" and flow["final_status"] not in ["accepted", "offer"]:
-                flow["has_withdrew"] = True
-                flow["final_status"] = "withdrew"
-            elif status == "rejected" and flow["final_status"] not in ["accepted", "offer", "withdrew"]:
-                flow["has_rejected"] = True
-                flow["final_status"] = "rejected"
-            elif status.startswith("interview_") and flow["final_status"] == "no_reply":
-                flow["final_status"] = f"interview_{flow['highest_interview']}"
-        
-        return company_flows
+        # Encode each company's outcome as an integer code (Unknown companies are skipped)
+        flows = self.company_flows.drop(index="Unknown", errors="ignore")
+        highest = flows["highest_interview"].to_numpy()
+        outcome = np.select(
+            [
+                flows["has_accepted"].to_numpy(),
+                flows["has_offer"].to_numpy(),
+                flows["has_withdrew"].to_numpy(),
+                flows["has_rejected"].to_numpy(),
+            ],
+            [OUTCOME_ACCEPTED, OUTCOME_DECLINED_OFFER, OUTCOME_WITHDREW, OUTCOME_REJECTED],
+            default=OUTCOME_GHOSTED,
+        )
+        
+        flow_counts["accepted"] = int(np.count_nonzero(outcome == OUTCOME_ACCEPTED))
+        flow_counts["declined_offer"] = int(np.count_nonzero(outcome == OUTCOME_DECLINED_OFFER))
+        
+        outcomes_by_stage = (("rejected", OUTCOME_REJECTED),
+                             ("withdrew", OUTCOME_WITHDREW),
+                             ("ghosted", OUTCOME_GHOSTED))
+        staged = np.isin(outcome, [code for _, code in outcomes_by_stage])
+        max_stage = int(highest[staged].max()) if staged.any() else 0
+        
+        for key, code in outcomes_by_stage:
+            stages = highest[outcome == code]
+            # Companies that reached an interview stage are counted by their highest stage
+            flow_counts[f"{key}_from_interview"] = np.bincount(
+                stages[stages > 0], minlength=max_stage + 1
+            )
+            flow_counts[f"{key}_direct"] = int(np.count_nonzero(stages == 0))
+        
+        return flow_counts
     
     def generate_sankey_diagram(self) -> go.Figure:
         """Generate Sankey diagram with accurate company flow tracking"""
-        # Get company flows to determine actual outcomes
-        company_flows = self._get_company_flow()
+        flow_counts = self.flow_counts
         
         # Count applications by source
         applied_count = self.stats["by_status"].get("applied", 0)
         recruiter_count = self.stats["by_status"].get("confirmation", 0)
         
-        excluded_statuses = {"no_reply", "not_job_related"}
-        
         if applied_count > 0 or recruiter_count > 0:
             total_applications = applied_count + recruiter_count
         else:
-            total_applications = sum(
-                count for status, count in self.stats["by_status"].items() 
-                if status not in excluded_statuses
-            )
-        
-        # Count companies by their actual flow outcome
-        flow_counts = {
-            "rejected_from_interview": {},  # interview stage -> count (rejected after this stage)
-            "rejected_direct": 0,  # rejected without interview
-            "withdrew_from_interview": {},  # interview stage -> count
-            "withdrew_direct": 0,
-            "ghosted_from_interview": {},  # interview stage -> count (ghosted after this stage)
-            "ghosted_direct": 0,  # ghosted without interview
-            "offer": 0,
-            "accepted": 0,
-            "declined_offer": 0,
-        }
-        
-        for company, flow in company_flows.items():
-            if company == "Unknown":
-                continue  # Skip Unknown companies
-            highest = flow["highest_interview"]
-            final = flow["final_status"]
-            
-            if flow["has_accepted"]:
-                flow_counts["accepted"] += 1
-            elif flow["has_offer"]:
-                if flow["has_withdrew"] or not flow["has_accepted"]:
-                    flow_counts["declined_offer"] += 1
-                else:
-                    flow_counts["offer"] += 1
-            elif flow["has_withdrew"]:
-                if highest > 0:
-                    if highest not in flow_counts["withdrew_from_interview"]:
-                        flow_counts["withdrew_from_interview"][highest] = 0
-                    flow_counts["withdrew_from_interview"][highest] += 1
-                else:
-                    flow_counts["withdrew_direct"] += 1
-            elif flow["has_rejected"]:
-                if highest > 0:
-                    # Rejected after reaching interview stage
-                    if highest not in flow_counts["rejected_from_interview"]:
-                        flow_counts["rejected_from_interview"][highest] = 0
-                    flow_counts["rejected_from_interview"][highest] += 1
-                else:
-                    flow_counts["rejected_direct"] += 1
-            elif highest > 0:
-                # Reached interview but no clear outcome - ghosted after interview
-                if highest not in flow_counts["ghosted_from_interview"]:
-                    flow_counts["ghosted_from_interview"][highest] = 0
-                flow_counts["ghosted_from_interview"][highest] += 1
-            else:
-                # No interview, no clear outcome - ghosted directly
-                flow_counts["ghosted_direct"] += 1
+            total_applications = self.summary["total_applications"]
         
         # Build Sankey diagram
         labels = []
-        source_indices = []
-        target_indices = []
-        values = []
-        colors = []
+        links = []  # (source, target, value, color) per link
         
         color_map = {
             "applied": "rgba(173, 216, 230, 0.8)",
@@ -286,47 +396,34 @@ class AnalyticsGenerator:
             "withdrew": "rgba(255, 165, 0, 0.6)",
         }
         
-        label_index = {}
-        current_index = 0
-        
-        def get_or_add_label(label):
-            nonlocal current_index
-            if label not in label_index:
-                label_index[label] = current_index
-                labels.append(label)
-                current_index += 1
-            return label_index[label]
-        
+        # Every node is added exactly once, so its index is the label list length
         # Applied sources
         if applied_count > 0:
-            applied_idx = get_or_add_label("Applied")
-            labels[applied_idx] = f"Applied ({applied_count})"
+            applied_idx = len(labels)
+            labels.append(f"Applied ({applied_count})")
         
         if recruiter_count > 0:
-            recruiter_idx = get_or_add_label("Recruiter")
-            labels[recruiter_idx] = f"Recruiter ({recruiter_count})"
+            recruiter_idx = len(labels)
+            labels.append(f"Recruiter ({recruiter_count})")
         
         # Total Applications
-        total_idx = get_or_add_label("Total Applications")
-        labels[total_idx] = f"Total Applications ({total_applications})"
+        total_idx = len(labels)
+        labels.append(f"Total Applications ({total_applications})")
         
         # Connect sources to total
         if applied_count > 0:
-            source_indices.append(applied_idx)
-            target_indices.append(total_idx)
-            values.append(applied_count)
-            colors.append(color_map["applied"])
+            links.append((applied_idx, total_idx, applied_count, color_map["applied"]))
         
         if recruiter_count > 0:
-            source_indices.append(recruiter_idx)
-            target_indices.append(total_idx)
-            values.append(recruiter_count)
-            colors.append(color_map["recruiter"])
+            links.append((recruiter_idx, total_idx, recruiter_count, color_map["recruiter"]))
         
         # Calculate totals for final status nodes
-        total_rejected = flow_counts["rejected_direct"] + sum(flow_counts["rejected_from_interview"].values())
-        total_withdrew = flow_counts["withdrew_direct"] + sum(flow_counts["withdrew_from_interview"].values())
-        total_ghosted = flow_counts["ghosted_direct"] + sum(flow_counts["ghosted_from_interview"].values())
+        rejected_from = flow_counts["rejected_from_interview"].tolist()
+        withdrew_from = flow_counts["withdrew_from_interview"].tolist()
+        ghosted_from = flow_counts["ghosted_from_interview"].tolist()
+        total_rejected = flow_counts["rejected_direct"] + sum(rejected_from)
+        total_withdrew = flow_counts["withdrew_direct"] + sum(withdrew_from)
+        total_ghosted = flow_counts["ghosted_direct"] + sum(ghosted_from)
         
         # Create single status nodes ONCE (no duplicates)
         rejected_idx = None
@@ -334,154 +431,89 @@ class AnalyticsGenerator:
         ghosted_idx = None
         
         if total_rejected > 0:
-            rejected_idx = get_or_add_label("Rejected")
-            labels[rejected_idx] = f"Rejected ({total_rejected})"
+            rejected_idx = len(labels)
+            labels.append(f"Rejected ({total_rejected})")
             
         if total_withdrew > 0:
-            withdrew_idx = get_or_add_label("Withdrew")
-            labels[withdrew_idx] = f"Withdrew ({total_withdrew})"
+            withdrew_idx = len(labels)
+            labels.append(f"Withdrew ({total_withdrew})")
             
         if total_ghosted > 0:
-            ghosted_idx = get_or_add_label("Ghosted")
-            labels[ghosted_idx] = f"Ghosted ({total_ghosted})"
+            ghosted_idx = len(labels)
+            labels.append(f"Ghosted ({total_ghosted})")
         
         # Connect direct outcomes (no interview)
         if rejected_idx is not None and flow_counts["rejected_direct"] > 0:
-            source_indices.append(total_idx)
-            target_indices.append(rejected_idx)
-            values.append(flow_counts["rejected_direct"])
-            colors.append(color_map["rejected"])
+            links.append((total_idx, rejected_idx, flow_counts["rejected_direct"], color_map["rejected"]))
         
         if withdrew_idx is not None and flow_counts["withdrew_direct"] > 0:
-            source_indices.append(total_idx)
-            target_indices.append(withdrew_idx)
-            values.append(flow_counts["withdrew_direct"])
-            colors.append(color_map["withdrew"])
+            links.append((total_idx, withdrew_idx, flow_counts["withdrew_direct"], color_map["withdrew"]))
         
         if ghosted_idx is not None and flow_counts["ghosted_direct"] > 0:
-            source_indices.append(total_idx)
-            target_indices.append(ghosted_idx)
-            values.append(flow_counts["ghosted_direct"])
-            colors.append(color_map["no_reply"])
+            links.append((total_idx, ghosted_idx, flow_counts["ghosted_direct"], color_map["no_reply"]))
         
         # Interview stages with flows - only connect consecutive stages
         # If a higher stage exists, assume all previous stages were reached
-        interview_stage_indices = {}
-        existing_stages = sorted(set(list(flow_counts["rejected_from_interview"].keys()) +
-                                    list(flow_counts["withdrew_from_interview"].keys()) +
-                                    list(flow_counts["ghosted_from_interview"].keys())))
+        max_stage = len(rejected_from) - 1
+        stage_totals = [
+            rejected_after + withdrew_after + ghosted_after
+            for rejected_after, withdrew_after, ghosted_after
+            in zip(rejected_from, withdrew_from, ghosted_from)
+        ]
         
         # Fill in missing intermediate stages
-        # If Interview 5 exists but Interview 4 doesn't, add Interview 4 with count 0
-        sorted_stages = []
-        if existing_stages:
-            max_stage = max(existing_stages)
-            for i in range(1, max_stage + 1):
-                if i in existing_stages or i < max_stage:
-                    sorted_stages.append(i)
+        # If Interview 5 exists but Interview 4 doesn't, Interview 4 shows the count of Interview 5
+        for stage_num in range(max_stage - 1, 0, -1):
+            if stage_totals[stage_num] == 0:
+                stage_totals[stage_num] = stage_totals[stage_num + 1]
         
         last_stage_idx = total_idx
-        last_stage_num = 0  # Track the actual stage number
         
-        for stage_num in sorted_stages:
+        for stage_num in range(1, max_stage + 1):
             # Create interview stage node
             stage_label = f"Interview {stage_num}" if stage_num > 1 else "First Interview"
-            stage_idx = get_or_add_label(stage_label)
+            total_at_stage = stage_totals[stage_num]
+            stage_idx = len(labels)
+            labels.append(f"{stage_label} ({total_at_stage})")
             
-            # Count companies that reached this stage
-            rejected_after = flow_counts["rejected_from_interview"].get(stage_num, 0)
-            withdrew_after = flow_counts["withdrew_from_interview"].get(stage_num, 0)
-            ghosted_after = flow_counts["ghosted_from_interview"].get(stage_num, 0)
-            total_at_stage = rejected_after + withdrew_after + ghosted_after
-            
-            # If this is a missing intermediate stage (inferred from higher stages),
-            # use the count from the next stage that has data
-            if total_at_stage == 0 and stage_num < max(existing_stages) if existing_stages else 0:
-                # This is an inferred stage - estimate count from next stage
-                # Use the minimum of stages after this one as estimate
-                next_stages = [s for s in existing_stages if s > stage_num]
-                if next_stages:
-                    # Use count from next existing stage as estimate for missing stage
-                    next_stage = min(next_stages)
-                    estimated_rejected = flow_counts["rejected_from_interview"].get(next_stage, 0)
-                    estimated_withdrew = flow_counts["withdrew_from_interview"].get(next_stage, 0)
-                    estimated_ghosted = flow_counts["ghosted_from_interview"].get(next_stage, 0)
-                    total_at_stage = estimated_rejected + estimated_withdrew + estimated_ghosted
-            
-            labels[stage_idx] = f"{stage_label} ({total_at_stage})"
-            interview_stage_indices[stage_num] = stage_idx
-            
-            # Only connect from previous consecutive stage (now all stages are consecutive)
-            if last_stage_num > 0 and stage_num == last_stage_num + 1:
-                # Consecutive stage - connect from previous
-                source_indices.append(last_stage_idx)
-                target_indices.append(stage_idx)
-                values.append(total_at_stage)
-                colors.append(color_map["interview"])
-            elif last_stage_num == 0:
-                # First interview stage - connect from total
-                source_indices.append(total_idx)
-                target_indices.append(stage_idx)
-                values.append(total_at_stage)
-                colors.append(color_map["interview"])
-            else:
-                # This shouldn't happen now, but handle it gracefully
-                source_indices.append(total_idx)
-                target_indices.append(stage_idx)
-                values.append(total_at_stage)
-                colors.append(color_map["interview"])
+            # Connect from the previous stage (the first stage connects from total)
+            links.append((last_stage_idx, stage_idx, total_at_stage, color_map["interview"]))
             
             # Flow to rejected (companies rejected after this interview)
-            if rejected_after > 0 and rejected_idx is not None:
-                source_indices.append(stage_idx)
-                target_indices.append(rejected_idx)
-                values.append(rejected_after)
-                colors.append(color_map["rejected"])
+            if rejected_from[stage_num] > 0 and rejected_idx is not None:
+                links.append((stage_idx, rejected_idx, rejected_from[stage_num], color_map["rejected"]))
             
             # Flow to withdrew (companies that withdrew after this interview)
-            if withdrew_after > 0 and withdrew_idx is not None:
-                source_indices.append(stage_idx)
-                target_indices.append(withdrew_idx)
-                values.append(withdrew_after)
-                colors.append(color_map["withdrew"])
+            if withdrew_from[stage_num] > 0 and withdrew_idx is not None:
+                links.append((stage_idx, withdrew_idx, withdrew_from[stage_num], color_map["withdrew"]))
             
             # Ghosted after this interview stage
-            ghosted_after = flow_counts["ghosted_from_interview"].get(stage_num, 0)
-            if ghosted_after > 0 and ghosted_idx is not None:
-                source_indices.append(stage_idx)
-                target_indices.append(ghosted_idx)
-                values.append(ghosted_after)
-                colors.append(color_map["no_reply"])
+            if ghosted_from[stage_num] > 0 and ghosted_idx is not None:
+                links.append((stage_idx, ghosted_idx, ghosted_from[stage_num], color_map["no_reply"]))
             
-            # Update tracking for next iteration
             last_stage_idx = stage_idx
-            last_stage_num = stage_num
         
         # Offer flow (from last interview stage)
         if flow_counts["offer"] > 0 or flow_counts["accepted"] > 0 or flow_counts["declined_offer"] > 0:
             total_offers = flow_counts["offer"] + flow_counts["accepted"] + flow_counts["declined_offer"]
-            offer_idx = get_or_add_label("Offer")
-            labels[offer_idx] = f"Offer ({total_offers})"
-            source_indices.append(last_stage_idx if interview_stage_indices else total_idx)
-            target_indices.append(offer_idx)
-            values.append(total_offers)
-            colors.append(color_map["offer"])
+            offer_idx = len(labels)
+            labels.append(f"Offer ({total_offers})")
+            links.append((last_stage_idx, offer_idx, total_offers, color_map["offer"]))
             
             if flow_counts["accepted"] > 0:
-                accepted_idx = get_or_add_label("Accepted")
-                labels[accepted_idx] = f"Accepted ({flow_counts['accepted']})"
-                source_indices.append(offer_idx)
-                target_indices.append(accepted_idx)
-                values.append(flow_counts["accepted"])
-                colors.append(color_map["accepted"])
+                accepted_idx = len(labels)
+                labels.append(f"Accepted ({flow_counts['accepted']})")
+                links.append((offer_idx, accepted_idx, flow_counts["accepted"], color_map["accepted"]))
             
             if flow_counts["declined_offer"] > 0:
-                declined_idx = get_or_add_label("Declined Offer")
-                labels[declined_idx] = f"Declined ({flow_counts['declined_offer']})"
-                source_indices.append(offer_idx)
-                target_indices.append(declined_idx)
-                values.append(flow_counts["declined_offer"])
-                colors.append(color_map["declined"])
+                declined_idx = len(labels)
+                labels.append(f"Declined ({flow_counts['declined_offer']})")
+                links.append((offer_idx, declined_idx, flow_counts["declined_offer"], color_map["declined"]))
+        
+        # Split links into the parallel sequences plotly expects
+        source_indices, target_indices, values, colors = (
+            (list(column) for column in zip(*links)) if links else ([], [], [], [])
+        )
         
         # Create Sankey diagram
         fig = go.Figure(data=[go.Sankey(
@@ -511,31 +543,67 @@ class AnalyticsGenerator:
     def save_analytics(self):
         """Save analytics to JSON and CSV files"""
         print("Generating summary statistics...")
-        summary = self.generate_summary()
-        summary["applications"] = self.stats["applications"]
-        summary["company_details"] = {
-            company: {
-                "count": data["count"],
-                "statuses": Counter(data["statuses"])
-            }
-            for company, data in self.stats["by_company"].items()
-        }
-        
-        # Save JSON
-        print(f"Saving analytics JSON to {ANALYTICS_JSON.name}...")
-        with open(ANALYTICS_JSON, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, default=str, ensure_ascii=False)
-        
-        # Save CSV
-        print(f"Saving analytics CSV to {ANALYTICS_CSV.name}...")
-        df = pd.DataFrame(self.stats["applications"])
-        df.to_csv(ANALYTICS_CSV, index=False, encoding='utf-8')
+        summary = dict(self.summary)
+        summary["applications"] = self._applications.to_dict("records")
+        summary["company_details"] = self.stats["by_company"]
         
-        # Save Sankey diagram
         print(f"Generating Sankey diagram...")
         fig = self.generate_sankey_diagram()
-        print(f"Saving Sankey diagram to {SANKEY_HTML.name}...")
-        fig.write_html(str(SANKEY_HTML))
+        
+        for output_dir in {ANALYTICS_JSON.parent, ANALYTICS_CSV.parent, SANKEY_HTML.parent}:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # The three outputs are independent, so write them concurrently
+        print(f"Saving analytics JSON to {ANALYTICS_JSON.name}...")
+        print(f"Saving analytics CSV to {ANALYTICS_CSV.name}...")
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            json_written = executor.submit(self._write_json, summary)
+            csv_written = executor.submit(self._write_csv)
+            sankey_written = executor.submit(self._write_sankey_html, fig)
+            json_written.result()
+            csv_written.result()
+            if sankey_written.result():
+                print(f"Saved Sankey diagram to {SANKEY_HTML.name}")
+            else:
+                print(f"Sankey diagram unchanged, keeping {SANKEY_HTML.name}")
         
         return summary
+    
+    @staticmethod
+    def _write_json(summary: Dict):
+        """Write the analytics summary as indented JSON"""
+        with open(ANALYTICS_JSON, 'wb') as f:
+            f.write(orjson.dumps(
+                summary,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            ))
+    
+    def _write_csv(self):
+        """Write one CSV row per application"""
+        self._applications.to_csv(ANALYTICS_CSV, index=False, encoding='utf-8')
+    
+    def _write_sankey_html(self, fig: go.Figure) -> bool:
+        """
+        Write the Sankey diagram HTML unless the same diagram was already written
+        
+        By default the HTML embeds the full plotly.js bundle, so rendering it dominates
+        small runs. A hash of the figure, plotly version and plotly.js mode is kept next
+        to the HTML file.
+        
+        Returns:
+            True if the HTML file was written, False if it was left unchanged
+        """
+        hash_file = SANKEY_HTML.with_name(SANKEY_HTML.name + ".hash")
+        include_plotlyjs = "cdn" if SANKEY_PLOTLYJS == "cdn" else True
+        payload = f"{plotly.__version__}\n{include_plotlyjs}\n{fig.to_json()}"
+        digest = hashlib.blake2b(payload.encode("utf-8")).hexdigest()
+        
+        if SANKEY_HTML.exists() and hash_file.exists():
+            if hash_file.read_text(encoding="utf-8") == digest:
+                return False
+        
+        fig.write_html(str(SANKEY_HTML), include_plotlyjs=include_plotlyjs, validate=False)
+        hash_file.write_text(digest, encoding="utf-8")
+        return True
 
@@ -1,8 +1,72 @@
 """Email classification logic using keyword-based matching (no LLM)"""
 
+import hashlib
+import os
 import re
-from typing import Dict, List, Optional, Tuple
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
+import orjson
+
+from src.config import CLASSIFICATION_CACHE
+
+# Below this many emails a process pool costs more than it saves
+PARALLEL_MIN_EMAILS = 200
+
+# Sender parsing for company names: "Name <email@company.com>" and the domain
+_SENDER_NAME_RE = re.compile(r'([^<]+)<')
+_SENDER_DOMAIN_RE = re.compile(r'@([a-zA-Z0-9.-]+)\.')
+
+# Common email service providers that do not identify a company
+_EMAIL_PROVIDERS = frozenset({"gmail", "yahoo", "outlook", "hotmail", "icloud", "mail"})
+
+# Job-related company domains/names, matched anywhere in the sender
+# (covers "jobs@linkedin.com" as well as "careers@acme.com" and "Acme Talent Team")
+_JOB_COMPANIES = frozenset({
+    "linkedin", "indeed", "glassdoor", "monster", "ziprecruiter",
+    "flexjobs", "recruiter", "hiring", "careers", "talent",
+    "workday", "greenhouse", "lever", "smartrecruiters",
+})
+
+# Classifier used by pool worker processes, built once per worker
+_worker_classifier = None
+
+
+def _split_keyword(pattern: str) -> Tuple[str, ...]:
+    """Split a `.*`-joined keyword pattern into its literal tokens"""
+    return tuple(token for token in pattern.split(".*") if token)
+
+
+def _tokens_match(tokens: Tuple[str, ...], text: str) -> bool:
+    """
+    Check if tokens appear in order on a single line of text
+    
+    Equivalent to searching for the regex "token1.*token2.*...", where `.` does
+    not match a newline, but uses plain substring searches instead of backtracking.
+    """
+    first = tokens[0]
+    start = text.find(first)
+    while start != -1:
+        line_end = text.find("\n", start)
+        if line_end == -1:
+            line_end = len(text)
+        
+        # Take the earliest occurrence of each following token on this line
+        position = start + len(first)
+        for token in tokens[1:]:
+            position = text.find(token, position, line_end)
+            if position == -1:
+                break
+            position += len(token)
+        else:
+            return True
+        
+        # Later occurrences on the same line cannot do better, so try the next line
+        start = text.find(first, line_end + 1)
+    return False
 
 
 class EmailClassifier:
@@ -159,13 +223,66 @@ class EmailClassifier:
         ],
     }
     
+    # High-signal job keywords checked against subject and sender before the full text scan.
+    # Each is also a single-token job keyword, so a hit here is a job keyword match.
+    FAST_JOB_KEYWORDS = frozenset({
+        "job", "application", "interview", "offer", "recruiter", "hiring", "vaga", "career",
+    })
+    
+    # Status decision rules in priority order: (status, score threshold, minimum confidence)
+    # Every status in STATUS_KEYWORDS has a rule
+    STATUS_PRIORITY = (
+        # Rejection overrides other statuses (high priority)
+        # Lower threshold for rejection to catch more cases
+        ("rejected", 0.3, 0.0),
+        # Accepted and offer override interview stages
+        ("accepted", 0.5, 0.0),
+        ("offer", 0.5, 0.0),
+        # Withdrew overrides most statuses
+        ("withdrew", 0.5, 0.0),
+        # Interview stages (check highest first)
+        ("interview_5", 0.4, 0.0),
+        ("interview_4", 0.4, 0.0),
+        ("interview_3", 0.4, 0.0),
+        ("interview_2", 0.4, 0.0),
+        ("interview_1", 0.4, 0.0),
+        ("confirmation", 0.4, 0.0),
+        # Applied - lower threshold to catch job board notifications and opportunities
+        ("applied", 0.1, 0.3),
+    )
+    
+    # Automated emails (job alerts, ATS confirmations) often repeat exactly
+    CLASSIFY_CACHE_SIZE = 4096
+    
     def __init__(self):
-        # Compile regex patterns for performance
-        self.compiled_patterns = {}
-        for status, patterns in self.STATUS_KEYWORDS.items():
-            self.compiled_patterns[status] = [
-                re.compile(pattern, re.IGNORECASE) for pattern in patterns
-            ]
+        # The classifier holds no per-email state, so results can be memoized per instance
+        self._classify_cached = lru_cache(maxsize=self.CLASSIFY_CACHE_SIZE)(self._classify_preview)
+        
+        # Every keyword pattern is literal tokens joined by ".*", so match the tokens
+        # with substring searches instead of compiling backtracking regexes
+        # Scores only depend on how many patterns match (capped at 3), not which ones, so
+        # check single-token patterns first: they need no ordered search and reach the cap soonest
+        self.keyword_tokens = {
+            status: sorted((_split_keyword(pattern) for pattern in patterns), key=len)
+            for status, patterns in self.STATUS_KEYWORDS.items()
+        }
+        # Distinct tokens across all statuses, probed once per email
+        self.distinct_tokens = frozenset(
+            token
+            for patterns in self.keyword_tokens.values()
+            for tokens in patterns
+            for token in tokens
+        )
+        # Each pattern's tokens as a set, so checking they are all present is one C-level subset test
+        self.keyword_token_sets = {
+            status: [(frozenset(tokens), tokens) for tokens in patterns]
+            for status, patterns in self.keyword_tokens.items()
+        }
+        # All of a status's tokens, to skip statuses none of whose patterns can match
+        self.status_tokens = {
+            status: frozenset(token for tokens in patterns for token in tokens)
+            for status, patterns in self.keyword_tokens.items()
+        }
         
         # Job-related keywords to filter out non-job emails
         self.job_keywords = [
@@ -186,14 +303,10 @@ class EmailClassifier:
             r"qa.*opportunity",  # QA positions
             r"automation.*qa",  # QA automation
         ]
-        self.job_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.job_keywords]
-    
-    def is_job_related(self, subject: str, body: str, from_address: str = "") -> bool:
-        """Check if email is related to job applications - improved filtering"""
-        text = f"{subject} {body[:2000]} {from_address}".lower()
+        self.job_tokens = [_split_keyword(pattern) for pattern in self.job_keywords]
         
-        # Exclude common non-job email patterns (strong exclusion signals)
-        exclusion_patterns = [
+        # Common non-job email patterns (strong exclusion signals)
+        self.exclusion_keywords = [
             r"newsletter", r"unsubscribe", r"subscription", r"promo", r"promotion",
             r"black.*friday", r"cyber.*monday", r"sale", r"discount", r"coupon",
             r"receipt", r"invoice", r"payment.*received", r"order.*confirmation",
@@ -202,28 +315,42 @@ class EmailClassifier:
             r"password.*reset", r"verify.*email.*address", r"account.*security",
             r"instagram.*follow", r"facebook.*friend", r"twitter.*notification",
         ]
-        exclusion_regex = [re.compile(p, re.IGNORECASE) for p in exclusion_patterns]
+        self.exclusion_tokens = [_split_keyword(pattern) for pattern in self.exclusion_keywords]
+    
+    def is_job_related(self, subject: str, body: str, from_address: str = "") -> bool:
+        """Check if email is related to job applications - improved filtering"""
+        # Fast path: most job emails name themselves in the subject or sender
+        header = f"{subject} {from_address}".lower()
+        if any(keyword in header for keyword in self.FAST_JOB_KEYWORDS):
+            return True
         
-        # If it matches exclusion patterns heavily AND has no job keywords, exclude it
-        exclusion_matches = sum(1 for pattern in exclusion_regex if pattern.search(text))
-        if exclusion_matches >= 2:
-            # Check if there are job keywords despite exclusion patterns
-            job_keyword_check = sum(1 for pattern in self.job_patterns if pattern.search(text))
-            if job_keyword_check == 0:  # No job keywords at all
-                return False
+        text = f"{subject} {body[:2000]} {from_address}".lower()
         
         # Check if any job keyword matches
-        matches = sum(1 for pattern in self.job_patterns if pattern.search(text))
+        job_keyword_match = any(_tokens_match(tokens, text) for tokens in self.job_tokens)
+        
+        # If it matches exclusion patterns heavily AND has no job keywords, exclude it
+        if not job_keyword_match:
+            exclusion_matches = 0
+            for tokens in self.exclusion_tokens:
+                if _tokens_match(tokens, text):
+                    exclusion_matches += 1
+                    if exclusion_matches >= 2:
+                        return False
         
         # Job-related company domains/names
-        job_companies = ["linkedin", "indeed", "glassdoor", "monster", "ziprecruiter", 
-                         "flexjobs", "recruiter", "hiring", "careers", "talent",
-                         "workday", "greenhouse", "lever", "smartrecruiters"]
-        company_match = any(jc in from_address.lower() for jc in job_companies)
+        company_match = self._is_job_sender(from_address)
         
         # Job-related if: at least 1 keyword match OR job company domain
         # But exclude if strong exclusion signals (handled above)
-        return (matches >= 1) or company_match
+        return job_keyword_match or company_match
+    
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def _is_job_sender(from_address: str) -> bool:
+        """Check if the sender names a job board, ATS or recruiting team"""
+        from_lower = from_address.lower()
+        return any(jc in from_lower for jc in _JOB_COMPANIES)
     
     def classify_email(self, subject: str, body: str, from_address: str = "") -> Tuple[str, float]:
         """
@@ -234,27 +361,39 @@ class EmailClassifier:
             confidence_score is between 0.0 and 1.0
             Returns ("not_job_related", 0.0) if email is not job-related
         """
+        # Optimize: Limit body length for performance (first 5000 chars should be enough)
+        # Nothing past the preview is read, so it makes an exact key for the result cache
+        body_preview = body[:5000] if body else body
+        return self._classify_cached(subject, body_preview, from_address)
+    
+    def _classify_preview(self, subject: str, body: str, from_address: str) -> Tuple[str, float]:
+        """Classify an email whose body is already cut to the preview length"""
         # First check if email is job-related
         if not self.is_job_related(subject, body, from_address):
             return ("not_job_related", 0.0)
         
-        # Optimize: Limit body length for performance (first 5000 chars should be enough)
-        body_preview = body[:5000].lower() if body else ""
+        body_preview = body.lower() if body else ""
         subject_lower = subject.lower() if subject else ""
         from_lower = from_address.lower() if from_address else ""
         
         # Combine text (prioritize subject and from, then body preview)
         text = f"{subject_lower} {from_lower} {body_preview}"
         
-        scores = {}
+        # Scan the text once per distinct token; patterns with a missing token cannot match
+        present = {token for token in self.distinct_tokens if token in text}
         
-        # Check each status category
-        for status, patterns in self.compiled_patterns.items():
+        # Score statuses in priority order and stop at the first whose score clears
+        # its threshold, so lower-priority statuses are never scored
+        for status, threshold, min_confidence in self.STATUS_PRIORITY:
+            if self.status_tokens[status].isdisjoint(present):
+                # No pattern can match, so the score is 0 and never clears a threshold
+                continue
+            patterns = self.keyword_tokens[status]
             score = 0.0
             matches = 0
             
-            for pattern in patterns:
-                if pattern.search(text):
+            for token_set, tokens in self.keyword_token_sets[status]:
+                if token_set <= present and _tokens_match(tokens, text):
                     matches += 1
                     # Early exit for high-confidence matches
                     if matches >= 3:
@@ -266,42 +405,11 @@ class EmailClassifier:
                 score = min(1.0, 0.3 + (matches * 0.2))
                 
                 # Boost score if found in subject (check subject directly, already lowercased)
-                if subject_lower and any(pattern.search(subject_lower) for pattern in patterns):
+                if subject_lower and any(_tokens_match(tokens, subject_lower) for tokens in patterns):
                     score = min(1.0, score + 0.2)
             
-            scores[status] = score
-        
-        # Handle special cases and priority rules
-        # Rejection overrides other statuses (high priority)
-        # Lower threshold for rejection to catch more cases
-        if scores.get("rejected", 0) > 0.3:
-            return ("rejected", scores["rejected"])
-        
-        # Accepted overrides interview stages
-        if scores.get("accepted", 0) > 0.5:
-            return ("accepted", scores["accepted"])
-        
-        # Offer overrides interview stages
-        if scores.get("offer", 0) > 0.5:
-            return ("offer", scores["offer"])
-        
-        # Withdrew overrides most statuses
-        if scores.get("withdrew", 0) > 0.5:
-            return ("withdrew", scores["withdrew"])
-        
-        # Interview stages (check highest first)
-        for i in range(5, 0, -1):
-            status = f"interview_{i}"
-            if scores.get(status, 0) > 0.4:
-                return (status, scores[status])
-        
-        # Confirmation
-        if scores.get("confirmation", 0) > 0.4:
-            return ("confirmation", scores["confirmation"])
-        
-        # Applied - lower threshold to catch job board notifications and opportunities
-        if scores.get("applied", 0) > 0.1:  # Lower threshold for more flexibility
-            return ("applied", max(scores["applied"], 0.3))  # Minimum confidence of 0.3
+            if score > threshold:
+                return (status, max(score, min_confidence))
         
         # Default: no_reply (if no match, but email is job-related)
         # This means email is job-related but doesn't fit any specific category
@@ -309,54 +417,208 @@ class EmailClassifier:
     
     def extract_company_name(self, from_address: str, subject: str) -> Optional[str]:
         """Extract company name from email"""
+        # Only the sender is used, and senders repeat heavily across an inbox
+        return self._company_from_sender(from_address)
+    
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def _company_from_sender(from_address: str) -> Optional[str]:
+        """Extract company name from a sender address"""
         # Try to extract from email domain or sender name
         # Pattern: "Name <email@company.com>"
-        match = re.search(r'([^<]+)<', from_address)
+        # Without a "<" the search can only fail, after retrying from every position
+        match = _SENDER_NAME_RE.search(from_address) if "<" in from_address else None
         if match:
             name = match.group(1).strip().strip('"').strip("'")
             if name and len(name) < 100:  # Reasonable name length
                 return name
         
         # Extract from domain
-        match = re.search(r'@([a-zA-Z0-9.-]+)\.', from_address)
+        match = _SENDER_DOMAIN_RE.search(from_address)
         if match:
             domain = match.group(1)
             # Remove common email service providers
-            if domain not in ["gmail", "yahoo", "outlook", "hotmail", "icloud", "mail"]:
+            if domain not in _EMAIL_PROVIDERS:
                 return domain.replace(".", " ").title()
         
         return None
     
-    def classify_emails(self, emails: List[Dict]) -> List[Dict]:
-        """Classify multiple emails and add status information (optimized for batch processing)"""
-        classified = []
+    @staticmethod
+    def create_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+        """Start worker processes that classify_emails can reuse across batches"""
+        return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker)
+    
+    def classify_emails(self, emails: List[Dict], workers: Optional[int] = 1,
+                        executor: Optional[ProcessPoolExecutor] = None,
+                        inplace: bool = False) -> List[Dict]:
+        """
+        Classify multiple emails and add status information (optimized for batch processing)
+        
+        Args:
+            emails: Email dictionaries with subject, body and from fields
+            workers: Number of worker processes (None uses one per CPU).
+                     Batches smaller than PARALLEL_MIN_EMAILS are always classified here.
+            executor: Pool from create_pool with that many workers, reused instead of
+                      starting a new one for this call
+            inplace: Add the status information to the given dictionaries and return
+                     them, instead of copying every email
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(emails) < PARALLEL_MIN_EMAILS:
+            return [self.classify_one(email_data, inplace) for email_data in emails]
+        if executor is None:
+            with self.create_pool(workers) as executor:
+                return self.classify_emails(emails, workers, executor, inplace)
+        
+        # Workers only need the fields the classifier reads, not the full email bodies
+        fields = []
         for email_data in emails:
-            try:
-                status, confidence = self.classify_email(
-                    email_data.get("subject", ""),
-                    email_data.get("body", ""),
-                    email_data.get("from", "")
-                )
-                
-                company = self.extract_company_name(
-                    email_data.get("from", ""),
-                    email_data.get("subject", "")
-                )
-                
-                classified.append({
-                    **email_data,
-                    "status": status,
-                    "confidence": confidence,
-                    "company": company or "Unknown"
-                })
-            except Exception:
-                # If classification fails, add with default values
-                classified.append({
-                    **email_data,
-                    "status": "no_reply",
-                    "confidence": 0.0,
-                    "company": "Unknown"
-                })
+            body = email_data.get("body", "")
+            fields.append((
+                email_data.get("subject", ""),
+                body[:5000] if isinstance(body, str) else body,
+                email_data.get("from", ""),
+            ))
+        
+        chunk_size = max(1, len(fields) // (workers * 4))
+        chunks = [fields[i:i + chunk_size] for i in range(0, len(fields), chunk_size)]
+        results = [result for chunk in executor.map(_classify_chunk, chunks) for result in chunk]
+        
+        return [
+            self._annotate(email_data, *result, inplace=inplace)
+            for email_data, result in zip(emails, results)
+        ]
+    
+    def classify_one(self, email_data: Dict, inplace: bool = False) -> Dict:
+        """Classify a single email, returning a copy with its status information (or the email itself if inplace)"""
+        result = self._classify_fields(
+            email_data.get("subject", ""),
+            email_data.get("body", ""),
+            email_data.get("from", "")
+        )
+        return self._annotate(email_data, *result, inplace=inplace)
+    
+    @staticmethod
+    def _annotate(email_data: Dict, status: str, confidence: float, company: str,
+                  inplace: bool = False) -> Dict:
+        """Copy of an email with its classification added, or the email itself if inplace"""
+        if inplace:
+            email_data["status"] = status
+            email_data["confidence"] = confidence
+            email_data["company"] = company
+            return email_data
+        return {
+            **email_data,
+            "status": status,
+            "confidence": confidence,
+            "company": company,
+        }
+    
+    def _classify_fields(self, subject: str, body: str, from_address: str) -> Tuple[str, float, str]:
+        """Classify one email's fields into (status, confidence, company)"""
+        try:
+            status, confidence = self.classify_email(subject, body, from_address)
+            company = self.extract_company_name(from_address, subject)
+            return (status, confidence, company or "Unknown")
+        except Exception:
+            # If classification fails, use default values
+            return ("no_reply", 0.0, "Unknown")
+
+
+class ClassificationCache:
+    """
+    Classification results kept between runs, keyed by a hash of the fields they depend on
+    
+    The cache is tied to this module's source, so changing the classifier's keywords or
+    rules starts a fresh cache instead of reusing results it would no longer produce.
+    """
+    
+    def __init__(self, cache_file: Path = None):
+        self.cache_file = cache_file or CLASSIFICATION_CACHE
+        self.version = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).hexdigest()
+        self.results = self._load()
+    
+    def _load(self) -> Dict[str, list]:
+        """Read the saved results, or none if the file is missing, unreadable or outdated"""
+        try:
+            data = orjson.loads(self.cache_file.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"[WARNING] Ignoring unreadable classification cache: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return {}
+        results = data.get("results", {})
+        if not isinstance(results, dict) or not all(
+            isinstance(result, list) and len(result) == 3 and isinstance(result[0], str)
+            for result in results.values()
+        ):
+            print("[WARNING] Ignoring malformed classification cache")
+            return {}
+        # Decoding gives every result its own status and company strings; share one
+        # interned copy of each, so equal values compare by identity
+        for result in results.values():
+            result[0] = sys.intern(result[0])
+            if isinstance(result[2], str):
+                result[2] = sys.intern(result[2])
+        return results
+    
+    @staticmethod
+    def key(email_data: Dict) -> str:
+        """Hash of the subject, body preview and sender, the only fields classification reads"""
+        body = email_data.get("body", "")
+        fields = (
+            email_data.get("subject", ""),
+            body[:5000] if isinstance(body, str) else body,
+            email_data.get("from", ""),
+        )
+        return hashlib.blake2b(repr(fields).encode(), digest_size=16).hexdigest()
+    
+    def add(self, classified_emails: Iterable[Dict]):
+        """Remember the classification of already classified emails"""
+        for email_data in classified_emails:
+            self.results[self.key(email_data)] = [
+                email_data["status"], email_data["confidence"], email_data["company"],
+            ]
+    
+    def apply(self, emails: List[Dict], keys: List[str]) -> List[Dict]:
+        """Copies of the emails with a cached classification added, skipping uncached ones"""
+        return [
+            EmailClassifier._annotate(email_data, *self.results[key])
+            for email_data, key in zip(emails, keys)
+            if key in self.results
+        ]
+    
+    def save(self, keys: Optional[Iterable[str]] = None) -> bool:
+        """
+        Write the results, replacing the previous cache file only once fully written
         
-        return classified
+        Args:
+            keys: Keys of the emails seen this run; results for any other email are
+                  dropped, so the cache does not keep growing with emails long gone
+        """
+        if keys is not None:
+            self.results = {key: self.results[key] for key in keys if key in self.results}
+        temp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        try:
+            temp_file.write_bytes(orjson.dumps({"version": self.version, "results": self.results}))
+            os.replace(temp_file, self.cache_file)
+            return True
+        except OSError as e:
+            print(f"[WARNING] Could not save classification cache: {e}")
+            return False
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+
+
+def _init_worker():
+    """Build the classifier once in each pool worker process"""
+    global _worker_classifier
+    _worker_classifier = EmailClassifier()
+
 
+def _classify_chunk(chunk: List[Tuple[str, str, str]]) -> List[Tuple[str, float, str]]:
+    """Classify a chunk of (subject, body, from) tuples in a pool worker process"""
+    return [_worker_classifier._classify_fields(*fields) for fields in chunk]
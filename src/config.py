@@ -10,8 +10,6 @@ load_dotenv()
 PROJECT_ROOT = Path(__file__).parent.parent
 INPUT_DIR = PROJECT_ROOT / "input"
 OUTPUT_DIR = PROJECT_ROOT / "output"
-INPUT_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
 
 # Email storage file in input folder
 EMAILS_STORAGE_FILE = INPUT_DIR / "emails.json"
@@ -31,3 +29,15 @@ ANALYTICS_JSON = OUTPUT_DIR / "analytics.json"
 ANALYTICS_CSV = OUTPUT_DIR / "applications.csv"
 SANKEY_HTML = OUTPUT_DIR / "sankey_diagram.html"
 
+# Classifications from earlier runs, reused for emails that have not changed
+CLASSIFICATION_CACHE = OUTPUT_DIR / "classification_cache.json"
+
+# How the Sankey HTML includes plotly.js: "inline" embeds it so the file works
+# offline, "cdn" loads it from the plotly CDN and keeps the file a few KB
+SANKEY_PLOTLYJS = os.getenv("SANKEY_PLOTLYJS", "inline")
+
+
+def ensure_dirs():
+    """Create the input and output folders (called by entry points, not on import)"""
+    INPUT_DIR.mkdir(exist_ok=True)
+    OUTPUT_DIR.mkdir(exist_ok=True)
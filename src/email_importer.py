@@ -1,13 +1,289 @@
 """Import emails from exported .mbox files (Google Takeout format)"""
 
 import email
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from email.header import decode_header
+from email.parser import BytesParser
+from email.policy import compat32
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import BinaryIO, Iterator, List, Dict, Optional, Tuple
 from tqdm import tqdm
-import mailbox
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from src.config import INPUT_DIR
+from src.html_text import html_to_text
+
+# Line separator mailbox.mbox uses to find the blank line that ends each message
+_LINESEP = os.linesep.encode("ascii")
+
+# Bytes read from the mbox file at a time
+MBOX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Messages between progress bar updates; tqdm's update locks and may redraw
+PROGRESS_BATCH_SIZE = 256
+
+# Parsed bytes of a mapped mbox file released from the page cache at a time, so a
+# large import does not evict everything else
+MBOX_RELEASE_BYTES = 64 * 1024 * 1024
+
+# Messages sent to a worker process at a time when parsing in parallel
+PARSE_BATCH_SIZE = 64
+
+# Below this many bytes an mbox file is parsed here; a process pool costs more than it saves
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Distinct header values remembered by the header and date decoders
+HEADER_CACHE_SIZE = 65536
+
+# One legacy-policy parser for every message; compat32 skips header refolding and validation
+_MESSAGE_PARSER = BytesParser(policy=compat32)
+
+# The Date header layout nearly every mail client writes, e.g. "Mon, 5 Feb 2024 10:00:00 +0000 (UTC)";
+# anything else goes through parsedate_to_datetime
+_RFC2822_DATE_RE = re.compile(
+    r"\s*(?:[A-Za-z]{3},\s*)?(\d{1,2}) ([A-Za-z]{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2}) ([+-])(\d{2})(\d{2})"
+    r"(?:\s+\([^()]*\))?\s*$"
+)
+_MONTHS = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+# Takeout folders holding account settings rather than mail
+SETTINGS_FOLDERS = frozenset({"configurações do usuário", "user settings", "user settings folder"})
+
+
+def _decode_header_value(header_value) -> str:
+    """Decode email header with robust error handling"""
+    if not header_value:
+        return ""
+    try:
+        decoded = decode_header(header_value)
+        parts = []
+        for part, encoding in decoded:
+            if isinstance(part, bytes):
+                # Try specified encoding first, then fallback to utf-8/latin1
+                try:
+                    if encoding:
+                        parts.append(part.decode(encoding, errors='ignore'))
+                    else:
+                        # Try common encodings
+                        for enc in ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']:
+                            try:
+                                parts.append(part.decode(enc, errors='ignore'))
+                                break
+                            except (UnicodeDecodeError, LookupError):
+                                continue
+                        else:
+                            parts.append(part.decode('utf-8', errors='ignore'))
+                except (UnicodeDecodeError, LookupError):
+                    # Final fallback
+                    parts.append(part.decode('utf-8', errors='ignore'))
+            else:
+                parts.append(str(part))
+        return "".join(parts)
+    except Exception:
+        # Ultimate fallback - return string representation
+        return str(header_value)[:200]
+
+
+@lru_cache(maxsize=None)
+def _utc_offset(sign: str, hours: str, minutes: str) -> Optional[timezone]:
+    """Time zone for a numeric "+hhmm" offset"""
+    offset = int(hours) * 3600 + int(minutes) * 60
+    # As in parsedate_to_datetime, "-0000" means the local time zone is unknown
+    if sign == "-" and not offset:
+        return None
+    return timezone(timedelta(seconds=-offset if sign == "-" else offset))
+
+
+def _parse_date_value(date_str) -> Optional[datetime]:
+    """Parse an RFC 2822 Date header, returning None when it is malformed"""
+    match = _RFC2822_DATE_RE.match(date_str) if isinstance(date_str, str) else None
+    if match:
+        day, month, year, hour, minute, second, sign, offset_hours, offset_minutes = match.groups()
+        month_number = _MONTHS.get(month.lower())
+        if month_number:
+            try:
+                return datetime(int(year), month_number, int(day), int(hour), int(minute), int(second),
+                                tzinfo=_utc_offset(sign, offset_hours, offset_minutes))
+            except ValueError:
+                pass
+    try:
+        return parsedate_to_datetime(date_str)
+    except Exception:
+        return None
+
+
+# Senders, list addresses and batch-sent dates repeat across a mailbox, so
+# string headers are decoded once per distinct value
+_decode_header_cached = lru_cache(maxsize=HEADER_CACHE_SIZE)(_decode_header_value)
+_parse_date_cached = lru_cache(maxsize=HEADER_CACHE_SIZE)(_parse_date_value)
+
+
+def _iter_mbox(mbox_file: BinaryIO, chunk_size: int = MBOX_CHUNK_SIZE) -> Iterator[Tuple[bytes, int]]:
+    """
+    Split an mbox file into raw messages, reading it in large chunks
+    
+    Messages start at lines beginning with "From ", as in mailbox.mbox.
+    
+    Yields:
+        Tuples of (message bytes, file offset where the message ends)
+    """
+    # A leading newline lets a From_ line at the very start of the file match too
+    buffer = b"\n"
+    buffer_offset = -1  # File offset of buffer[0]
+    start = -1  # Offset of the current message's From_ line, -1 before the first one
+    position = 0
+    eof = False
+    
+    while True:
+        boundary = buffer.find(b"\nFrom ", position)
+        if boundary != -1:
+            if start != -1:
+                yield _mbox_message(buffer[start:boundary + 1]), buffer_offset + boundary + 1
+            start = position = boundary + 1
+            continue
+        
+        if eof:
+            break
+        chunk = mbox_file.read(chunk_size)
+        if not chunk:
+            eof = True
+            continue
+        
+        # Keep the current message, or enough bytes to match a From_ line split across chunks
+        keep = start if start != -1 else max(len(buffer) - 5, 0)
+        position = max(len(buffer) - 5, position) - keep
+        if start != -1:
+            start = 0
+        buffer = buffer[keep:] + chunk
+        buffer_offset += keep
+    
+    if start != -1:
+        yield _mbox_message(buffer[start:]), buffer_offset + len(buffer)
+
+
+def _iter_mbox_spans(data) -> Iterator[Tuple[int, int]]:
+    """
+    Find the messages of an mbox file mapped into memory, without copying them
+    
+    Yields:
+        Tuples of (offset of the message's From_ line, offset where the message ends)
+    """
+    if data[:5] == b"From ":
+        start = 0
+    else:
+        start = data.find(b"\nFrom ")
+        if start == -1:
+            return
+        start += 1
+    
+    while True:
+        boundary = data.find(b"\nFrom ", start)
+        if boundary == -1:
+            break
+        yield start, boundary + 1
+        start = boundary + 1
+    yield start, len(data)
+
+
+def _iter_mbox_mapped(data) -> Iterator[Tuple[bytes, int]]:
+    """
+    Split an mbox file mapped into memory into raw messages
+    
+    Boundaries are found directly in the mapping, so only the messages themselves are copied.
+    
+    Yields:
+        Tuples of (message bytes, file offset where the message ends)
+    """
+    for start, end in _iter_mbox_spans(data):
+        yield _mbox_message(data[start:end]), end
+
+
+def _map_mbox(mbox_file: BinaryIO) -> Optional[mmap.mmap]:
+    """Map an mbox file into memory for reading front to back, or None if it cannot be mapped"""
+    try:
+        fd = mbox_file.fileno()
+        mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Not a regular file (or an empty one)
+        return None
+    # Let the kernel read ahead aggressively so disk reads overlap parsing
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return mapped
+
+
+def _release_pages(mapped: mmap.mmap, fd: int, start: int, end: int) -> int:
+    """
+    Drop the already parsed part of a mapped mbox file from memory and the page cache
+    
+    Returns:
+        The page-aligned offset up to which pages were released
+    """
+    end -= end % mmap.PAGESIZE
+    if end > start:
+        if hasattr(mmap, "MADV_DONTNEED"):
+            mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, start, end - start, os.POSIX_FADV_DONTNEED)
+    return max(end, start)
+
+
+def _mbox_message(blob: bytes) -> bytes:
+    """Strip the From_ line and the blank separator line from a raw mbox message"""
+    from_end = blob.find(b"\n")
+    if from_end == -1:
+        return b""
+    message = blob[from_end + 1:]
+    
+    # A blank last line separates messages and is not part of this one
+    if message == _LINESEP or message.endswith(b"\n" + _LINESEP):
+        message = message[:-len(_LINESEP)]
+    if _LINESEP != b"\n":
+        message = message.replace(_LINESEP, b"\n")
+    return message
+
+
+def _parse_raw_messages(importer: "EmailImporter", raw_messages: List[bytes]) -> List:
+    """Parse raw messages, returning the exception in place of any message that fails"""
+    results = []
+    for raw_message in raw_messages:
+        try:
+            results.append(importer._parse_message(_MESSAGE_PARSER.parsebytes(raw_message)))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+# The mbox file as mapped by each worker process parsing message offsets
+_worker_mapped = None
+
+
+def _init_mapped_worker(mbox_path: str):
+    """Map the mbox file once in a worker process"""
+    global _worker_mapped
+    with open(mbox_path, "rb") as mbox_file:
+        _worker_mapped = mmap.mmap(mbox_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parse_mapped_spans(importer: "EmailImporter", spans: List[Tuple[int, int]]) -> List:
+    """Parse the messages at the given offsets of the worker's mapped mbox file"""
+    results = _parse_raw_messages(importer, [_mbox_message(_worker_mapped[start:end]) for start, end in spans])
+    # Unmap the parsed whole pages, so the main process can drop them from the page cache
+    first = -(-spans[0][0] // mmap.PAGESIZE) * mmap.PAGESIZE
+    last = spans[-1][1] - spans[-1][1] % mmap.PAGESIZE
+    if last > first and hasattr(mmap, "MADV_DONTNEED"):
+        _worker_mapped.madvise(mmap.MADV_DONTNEED, first, last - first)
+    return results
 
 
 class EmailImporter:
@@ -17,80 +293,198 @@ class EmailImporter:
         self.input_dir = input_dir or INPUT_DIR
         self.input_dir.mkdir(exist_ok=True)
     
-    def import_from_mbox(self, mbox_path: Path, timeout_minutes: int = 30) -> List[Dict]:
+    def import_from_mbox(self, mbox_path: Path, timeout_minutes: int = 30,
+                         workers: Optional[int] = None) -> List[Dict]:
         """
         Import emails from mbox file (Google Takeout format)
         
         Args:
             mbox_path: Path to .mbox file
             timeout_minutes: Maximum time to wait (default: 30 minutes)
+            workers: Number of processes parsing messages (default: one per CPU)
         
         Returns:
             List of email dictionaries
         """
-        emails = []
+        return list(self.iter_from_mbox(mbox_path, timeout_minutes, workers))
+    
+    def iter_from_mbox(self, mbox_path: Path, timeout_minutes: int = 30,
+                       workers: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Import emails from mbox file one at a time, so they can be saved without
+        holding the whole mailbox in memory
+        
+        Takes the same arguments as import_from_mbox.
+        
+        Yields:
+            Email dictionaries
+        """
         start_time = datetime.now()
+        imported_count = 0
         
         if not mbox_path.exists():
             print(f"[ERROR] File not found: {mbox_path}")
-            return emails
+            return
         
         try:
             print(f"[INFO] Opening mbox file: {mbox_path.name}")
             print(f"[INFO] This may take several minutes for large files...")
-            mbox = mailbox.mbox(str(mbox_path))
-            total = len(mbox)
+            total_bytes = mbox_path.stat().st_size
             
-            if total == 0:
+            if total_bytes == 0:
                 print(f"[WARNING] Mbox file appears to be empty")
-                return emails
+                return
             
-            print(f"[INFO] Found {total} emails in file")
+            print(f"[INFO] File size: {total_bytes / (1024 * 1024):.1f} MB")
             print(f"[INFO] Starting import (timeout: {timeout_minutes} minutes)...")
             
-            imported_count = 0
             error_count = 0
+            message_count = 0
             
-            for msg in tqdm(mbox, desc=f"Importing from {mbox_path.name}", total=total, unit="email"):
-                # Check for timeout
-                elapsed = (datetime.now() - start_time).total_seconds() / 60
-                if elapsed > timeout_minutes:
-                    print(f"\n[WARNING] Timeout reached ({timeout_minutes} minutes)")
-                    print(f"[INFO] Imported {imported_count} emails before timeout")
-                    print(f"[INFO] You can continue importing later - the process will skip already imported emails")
-                    break
-                
-                try:
-                    email_data = self._parse_message(msg)
-                    if email_data:
-                        emails.append(email_data)
+            # Stream messages straight from the file instead of indexing it first
+            with open(mbox_path, "rb") as mbox_file, tqdm(
+                desc=f"Importing from {mbox_path.name}", total=total_bytes, unit="B", unit_scale=True
+            ) as progress:
+                end_offset = 0
+                for email_data, end_offset in self._parse_mbox(mbox_file, workers or os.cpu_count() or 1):
+                    message_count += 1
+                    if message_count % PROGRESS_BATCH_SIZE == 0:
+                        progress.update(end_offset - progress.n)
+                    
+                    # Check for timeout
+                    elapsed = (datetime.now() - start_time).total_seconds() / 60
+                    if elapsed > timeout_minutes:
+                        print(f"\n[WARNING] Timeout reached ({timeout_minutes} minutes)")
+                        print(f"[INFO] Imported {imported_count} emails before timeout")
+                        print(f"[INFO] You can continue importing later - the process will skip already imported emails")
+                        break
+                    
+                    if isinstance(email_data, Exception):
+                        e = email_data
+                        error_count += 1
+                        # Only show first 5 unique error types, suppress encoding errors
+                        error_str = str(e).lower()
+                        if error_count <= 5 and 'encoding' not in error_str and 'unknown-8bit' not in error_str:
+                            print(f"\n[WARNING] Error parsing email {imported_count + error_count}: {str(e)[:100]}")
+                    elif email_data:
                         imported_count += 1
-                except Exception as e:
-                    error_count += 1
-                    # Only show first 5 unique error types, suppress encoding errors
-                    error_str = str(e).lower()
-                    if error_count <= 5 and 'encoding' not in error_str and 'unknown-8bit' not in error_str:
-                        print(f"\n[WARNING] Error parsing email {imported_count + error_count}: {str(e)[:100]}")
-                    continue
+                        yield email_data
+                progress.update(end_offset - progress.n)
+            
+            if message_count == 0:
+                print(f"[WARNING] Mbox file appears to be empty")
+                return
             
             elapsed_time = (datetime.now() - start_time).total_seconds()
-            print(f"\n[SUCCESS] Imported {len(emails)} emails from mbox file in {elapsed_time:.1f} seconds")
+            print(f"\n[SUCCESS] Imported {imported_count} emails from mbox file in {elapsed_time:.1f} seconds")
             if error_count > 0:
                 print(f"[INFO] {error_count} emails had parsing errors and were skipped")
-            
-            return emails
         except KeyboardInterrupt:
             print(f"\n[INFO] Import interrupted by user")
-            print(f"[INFO] Imported {len(emails)} emails before interruption")
-            return emails
+            print(f"[INFO] Imported {imported_count} emails before interruption")
         except Exception as e:
             print(f"\n[ERROR] Error reading mbox file: {type(e).__name__}: {e}")
-            print(f"[INFO] Successfully imported {len(emails)} emails before error occurred")
+            print(f"[INFO] Successfully imported {imported_count} emails before error occurred")
             import traceback
             print(f"[DEBUG] Full error traceback:")
             traceback.print_exc()
-            return emails
     
+    def _parse_mbox(self, mbox_file: BinaryIO, workers: int) -> Iterator[Tuple[object, int]]:
+        """
+        Parse the messages of an mbox file in order, in worker processes when workers > 1
+        and the file is at least PARALLEL_MIN_BYTES
+        
+        Yields:
+            Tuples of (result, file offset where the message ends), where the result is
+            the email dictionary, None, or the exception raised while parsing it
+        """
+        if workers <= 1 or os.fstat(mbox_file.fileno()).st_size < PARALLEL_MIN_BYTES:
+            for raw_message, end_offset in self._split_mbox(mbox_file):
+                yield _parse_raw_messages(self, [raw_message])[0], end_offset
+            return
+        
+        mapped = _map_mbox(mbox_file)
+        if mapped is None:
+            # Send the messages themselves to the workers
+            executor = ProcessPoolExecutor(max_workers=workers)
+            yield from self._parse_in_workers(executor, _iter_mbox(mbox_file), _parse_raw_messages, workers)
+            return
+        
+        # Workers map the file too and are only sent each message's offsets,
+        # so message bytes never pass between processes
+        fd = mbox_file.fileno()
+        released = 0
+        
+        def release(end_offset: int):
+            nonlocal released
+            if end_offset - released >= MBOX_RELEASE_BYTES:
+                released = _release_pages(mapped, fd, released, end_offset)
+        
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_mapped_worker, initargs=(mbox_file.name,)
+        )
+        with mapped:
+            spans = ((span, span[1]) for span in _iter_mbox_spans(mapped))
+            yield from self._parse_in_workers(executor, spans, _parse_mapped_spans, workers, release)
+    
+    def _parse_in_workers(self, executor: ProcessPoolExecutor, messages: Iterator[Tuple[object, int]],
+                          parse_batch, workers: int, release=None) -> Iterator[Tuple[object, int]]:
+        """
+        Parse messages in batches in worker processes, yielding the results in order
+        
+        Args:
+            executor: Pool to parse in, shut down when done
+            messages: Tuples of (message or its offsets, file offset where the message ends)
+            parse_batch: Module-level function parsing a list of messages in a worker
+            workers: Number of worker processes
+            release: Called with the end offset of each batch whose results were yielded
+        """
+        # Keep a few batches per worker in flight so the file is never read far ahead
+        try:
+            pending = deque()
+            batch = []
+            for message, end_offset in messages:
+                batch.append((message, end_offset))
+                if len(batch) < PARSE_BATCH_SIZE:
+                    continue
+                pending.append(self._submit_batch(executor, parse_batch, batch))
+                batch = []
+                if len(pending) > workers * 2:
+                    yield from self._batch_results(*pending.popleft(), release)
+            if batch:
+                pending.append(self._submit_batch(executor, parse_batch, batch))
+            while pending:
+                yield from self._batch_results(*pending.popleft(), release)
+        finally:
+            executor.shutdown(cancel_futures=True)
+    
+    @staticmethod
+    def _split_mbox(mbox_file: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+        """Split an mbox file into raw messages, mapping it into memory when possible"""
+        mapped = _map_mbox(mbox_file)
+        if mapped is None:
+            # Read it in chunks instead
+            yield from _iter_mbox(mbox_file)
+            return
+        with mapped:
+            fd = mbox_file.fileno()
+            released = 0
+            for raw_message, end_offset in _iter_mbox_mapped(mapped):
+                yield raw_message, end_offset
+                if end_offset - released >= MBOX_RELEASE_BYTES:
+                    released = _release_pages(mapped, fd, released, end_offset)
+    
+    def _submit_batch(self, executor: ProcessPoolExecutor, parse_batch, batch: List[Tuple[object, int]]):
+        """Submit a batch of messages for parsing, keeping their end offsets"""
+        messages = [message for message, _ in batch]
+        return executor.submit(parse_batch, self, messages), [end for _, end in batch]
+    
+    @staticmethod
+    def _batch_results(future, end_offsets: List[int], release=None) -> Iterator[Tuple[object, int]]:
+        """Pair a parsed batch's results with their end offsets"""
+        yield from zip(future.result(), end_offsets)
+        if release is not None:
+            release(end_offsets[-1])
     
     def _parse_message(self, msg: email.message.Message) -> Optional[Dict]:
         """Parse email message object into dictionary"""
@@ -103,11 +497,10 @@ class EmailImporter:
             # Parse date
             date = None
             if date_str:
-                try:
-                    from email.utils import parsedate_to_datetime
-                    date = parsedate_to_datetime(date_str)
-                except:
-                    pass
+                if isinstance(date_str, str):
+                    date = _parse_date_cached(date_str)
+                else:
+                    date = _parse_date_value(date_str)
             
             # Extract body
             body = self._extract_body(msg)
@@ -132,141 +525,128 @@ class EmailImporter:
     
     def _decode_header(self, header_value: str) -> str:
         """Decode email header with robust error handling"""
-        if not header_value:
-            return ""
-        try:
-            from email.header import decode_header
-            decoded = decode_header(header_value)
-            parts = []
-            for part, encoding in decoded:
-                if isinstance(part, bytes):
-                    # Try specified encoding first, then fallback to utf-8/latin1
-                    try:
-                        if encoding:
-                            parts.append(part.decode(encoding, errors='ignore'))
-                        else:
-                            # Try common encodings
-                            for enc in ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']:
-                                try:
-                                    parts.append(part.decode(enc, errors='ignore'))
-                                    break
-                                except (UnicodeDecodeError, LookupError):
-                                    continue
-                            else:
-                                parts.append(part.decode('utf-8', errors='ignore'))
-                    except (UnicodeDecodeError, LookupError):
-                        # Final fallback
-                        parts.append(part.decode('utf-8', errors='ignore'))
-                else:
-                    parts.append(str(part))
-            return "".join(parts)
-        except Exception:
-            # Ultimate fallback - return string representation
-            return str(header_value)[:200]
+        if isinstance(header_value, str):
+            return _decode_header_cached(header_value)
+        # email.header.Header values are unhashable
+        return _decode_header_value(header_value)
     
     def _extract_body(self, msg: email.message.Message) -> str:
         """Extract text body from email message"""
         body = ""
         
         if msg.is_multipart():
+            html_part = None
             for part in msg.walk():
                 content_type = part.get_content_type()
                 if content_type == "text/plain":
                     payload = part.get_payload(decode=True)
                     if payload:
-                        try:
-                            body += payload.decode('utf-8', errors='ignore')
-                        except:
-                            body += str(payload)
-                elif content_type == "text/html":
-                    # Extract text from HTML if no plain text found
-                    if not body:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            try:
-                                html_content = payload.decode('utf-8', errors='ignore')
-                                from bs4 import BeautifulSoup
-                                soup = BeautifulSoup(html_content, 'lxml')
-                                body = soup.get_text(separator=' ', strip=True)
-                            except:
-                                pass
+                        # The first plain text part is the message body
+                        return self._decode_payload(part, payload)
+                elif content_type == "text/html" and html_part is None:
+                    html_part = part
+            
+            # Extract text from HTML if no plain text found
+            if html_part is not None:
+                payload = html_part.get_payload(decode=True)
+                if payload:
+                    try:
+                        body = html_to_text(self._decode_payload(html_part, payload))
+                    except:
+                        pass
         else:
             content_type = msg.get_content_type()
             payload = msg.get_payload(decode=True)
             if payload:
+                html_content = self._decode_payload(msg, payload)
                 if content_type == "text/html":
                     try:
-                        from bs4 import BeautifulSoup
-                        html_content = payload.decode('utf-8', errors='ignore')
-                        soup = BeautifulSoup(html_content, 'lxml')
-                        body = soup.get_text(separator=' ', strip=True)
+                        body = html_to_text(html_content)
                     except:
-                        body = payload.decode('utf-8', errors='ignore')
+                        body = html_content
                 else:
-                    body = payload.decode('utf-8', errors='ignore')
+                    body = html_content
         
         return body
     
+    @staticmethod
+    def _decode_payload(part: email.message.Message, payload: bytes) -> str:
+        """Decode a part's payload with its declared charset, falling back to UTF-8"""
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors='ignore')
+        except LookupError:
+            # Unknown charset name
+            return payload.decode('utf-8', errors='ignore')
+    
     def auto_import(self) -> List[Dict]:
         """
         Automatically detect and import .mbox files from input folder
         Recursively searches for .mbox files (handles Google Takeout folder structure)
         """
-        all_emails = []
+        return list(self.iter_auto_import())
+    
+    def iter_auto_import(self) -> Iterator[Dict]:
+        """Import the .mbox files found in the input folder, yielding emails one at a time"""
+        total_count = 0
         
         # Recursively look for .mbox files (handles nested Google Takeout folders)
         print("Searching for .mbox files...")
-        mbox_files = list(self.input_dir.rglob("*.mbox"))
+        mbox_files = list(self._walk_mbox(self.input_dir))
         
         if not mbox_files:
             print(f"[INFO] No .mbox files found in {self.input_dir}")
             print("\nTip: Extract your Google Takeout ZIP and place the .mbox file(s) in the input/ folder")
-            return all_emails
+            return
         
         print(f"[INFO] Found {len(mbox_files)} .mbox file(s)")
         
-        # Filter out any .mbox files in configuration/user settings folders
-        # Only filter if they're in a subdirectory that looks like a settings folder
-        filtered_mbox_files = []
         for mbox_file in mbox_files:
-            # Skip files only if they're in a configuration/settings folder path
-            # Check folder structure, not filename
-            path_parts = [p.lower() for p in mbox_file.parts[:-1]]  # Exclude filename itself
-            
-            # Check if any parent directory is a settings folder
-            is_in_settings_folder = False
-            for part in path_parts:
-                # Only match exact folder names that indicate settings/config folders
-                if part in ['configurações do usuário', 'user settings', 'user settings folder']:
-                    is_in_settings_folder = True
-                    break
-            
-            if not is_in_settings_folder:
-                filtered_mbox_files.append(mbox_file)
-            else:
-                print(f"[INFO] Skipping file in settings folder: {mbox_file.relative_to(self.input_dir)}")
-        
-        if not filtered_mbox_files:
-            print(f"[WARNING] No valid .mbox files found after filtering")
-            return all_emails
-        
-        for mbox_file in filtered_mbox_files:
             print(f"\n[INFO] Processing mbox file: {mbox_file.relative_to(self.input_dir)}")
+            file_count = 0
             try:
-                file_emails = self.import_from_mbox(mbox_file)
-                all_emails.extend(file_emails)
-                if len(file_emails) == 0:
+                for email_data in self.iter_from_mbox(mbox_file):
+                    file_count += 1
+                    total_count += 1
+                    yield email_data
+                if file_count == 0:
                     print(f"[WARNING] No emails were imported from {mbox_file.name}")
             except KeyboardInterrupt:
                 print(f"\n[INFO] Import process interrupted by user")
-                print(f"[INFO] Successfully imported {len(all_emails)} emails before interruption")
+                print(f"[INFO] Successfully imported {total_count} emails before interruption")
                 break
             except Exception as e:
                 print(f"\n[ERROR] Failed to import from {mbox_file.name}: {type(e).__name__}: {e}")
                 import traceback
                 traceback.print_exc()
                 continue
-        
-        return all_emails
-
-
+    
+    def _walk_mbox(self, root: Path) -> Iterator[Path]:
+        """
+        Yield .mbox files under root, depth first, each file only once
+        Configuration/user settings folders are skipped without being scanned
+        """
+        stack = [str(root)]
+        seen = set()  # (device, inode) of files already yielded, e.g. through a link
+        while stack:
+            subdirs = []
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            # Only match exact folder names that indicate settings/config folders
+                            if entry.name.lower() in SETTINGS_FOLDERS:
+                                print(f"[INFO] Skipping settings folder: {Path(entry.path).relative_to(root)}")
+                            else:
+                                subdirs.append(entry.path)
+                        elif entry.name.endswith(".mbox") and entry.is_file():
+                            stat = entry.stat()
+                            file_id = (stat.st_dev, stat.st_ino)
+                            if file_id not in seen:
+                                seen.add(file_id)
+                                yield Path(entry.path)
+            except OSError as e:
+                print(f"[WARNING] Could not read folder {e.filename}: {e.strerror}")
+                continue
+            # Reversed so folders are visited in directory order
+            stack.extend(reversed(subdirs))
@@ -1,17 +1,49 @@
 """Email parsing module with IMAP support"""
 
 import imaplib
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from email.message import Message
 from email.header import decode_header
 from email.utils import parsedate_to_datetime
 from email import message_from_bytes
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 import ssl
 from tqdm import tqdm
-from bs4 import BeautifulSoup
 
 from src.config import EMAIL_ADDRESS, EMAIL_PASSWORD, IMAP_SERVER, IMAP_PORT
+from src.html_text import html_to_text
+
+# Messages requested per IMAP FETCH command
+FETCH_BATCH_SIZE = 100
+
+# Distinct Subject/From values remembered by the header decoder
+HEADER_CACHE_SIZE = 65536
+
+_FETCH_UID_RE = re.compile(rb"\bUID (\d+)")
+_ESEARCH_ALL_RE = re.compile(rb"\bALL (\S+)")
+
+
+def _decode_header_value(header_value) -> str:
+    """Decode email header"""
+    if not header_value:
+        return ""
+    decoded = decode_header(header_value)
+    parts = []
+    for part, encoding in decoded:
+        if isinstance(part, bytes):
+            parts.append(part.decode(encoding or 'utf-8', errors='ignore'))
+        else:
+            parts.append(part)
+    return "".join(parts)
+
+
+# Senders and subjects repeat across a mailbox, so each distinct value is decoded once
+_decode_header_cached = lru_cache(maxsize=HEADER_CACHE_SIZE)(_decode_header_value)
 
 
 class EmailParser:
@@ -48,96 +80,224 @@ class EmailParser:
     
     def _decode_header(self, header_value: str) -> str:
         """Decode email header"""
-        if not header_value:
-            return ""
-        decoded = decode_header(header_value)
-        parts = []
-        for part, encoding in decoded:
-            if isinstance(part, bytes):
-                parts.append(part.decode(encoding or 'utf-8', errors='ignore'))
-            else:
-                parts.append(part)
-        return "".join(parts)
+        if isinstance(header_value, str):
+            return _decode_header_cached(header_value)
+        # email.header.Header values are unhashable
+        return _decode_header_value(header_value)
     
     def _extract_text_from_html(self, html_content: str) -> str:
         """Extract plain text from HTML email"""
         if not html_content:
             return ""
-        soup = BeautifulSoup(html_content, 'lxml')
-        return soup.get_text(separator=' ', strip=True)
+        return html_to_text(html_content)
     
     def _parse_email_body(self, msg: Message) -> str:
         """Extract text body from email"""
         body = ""
         if msg.is_multipart():
+            html_part = None
             for part in msg.walk():
                 content_type = part.get_content_type()
                 if content_type == "text/plain":
                     payload = part.get_payload(decode=True)
                     if payload:
-                        body += payload.decode('utf-8', errors='ignore')
-                elif content_type == "text/html":
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        html_content = payload.decode('utf-8', errors='ignore')
-                        body += self._extract_text_from_html(html_content)
+                        # The first plain text part is the message body
+                        return self._decode_payload(part, payload)
+                elif content_type == "text/html" and html_part is None:
+                    html_part = part
+            
+            # Extract text from HTML only if no plain text found
+            if html_part is not None:
+                payload = html_part.get_payload(decode=True)
+                if payload:
+                    body = self._extract_text_from_html(self._decode_payload(html_part, payload))
         else:
             content_type = msg.get_content_type()
             payload = msg.get_payload(decode=True)
             if payload:
                 if content_type == "text/html":
                     body = self._extract_text_from_html(
-                        payload.decode('utf-8', errors='ignore')
+                        self._decode_payload(msg, payload)
                     )
                 else:
-                    body = payload.decode('utf-8', errors='ignore')
+                    body = self._decode_payload(msg, payload)
         return body
     
-    def fetch_emails(self, search_criteria: str = "ALL", limit: Optional[int] = None) -> List[Dict]:
-        """Fetch emails from mailbox"""
+    @staticmethod
+    def _decode_payload(part: Message, payload: bytes) -> str:
+        """Decode a part's payload with its declared charset, falling back to UTF-8"""
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors='ignore')
+        except LookupError:
+            # Unknown charset name
+            return payload.decode('utf-8', errors='ignore')
+    
+    @staticmethod
+    def _split_fetch_response(msg_data: list) -> Dict[bytes, bytes]:
+        """Map UIDs to raw messages in a multi-message UID FETCH response"""
+        raw_messages = {}
+        raw_message = None
+        for item in msg_data:
+            # Each message is a (b"<num> (UID <uid> BODY[] {<size>}", <message>) tuple
+            # followed by b")", though the UID may come after the message instead
+            if isinstance(item, tuple):
+                match = _FETCH_UID_RE.search(item[0])
+                if match:
+                    raw_messages[match.group(1)] = item[1]
+                    raw_message = None
+                else:
+                    raw_message = item[1]
+            elif raw_message is not None and item:
+                match = _FETCH_UID_RE.search(item)
+                if match:
+                    raw_messages[match.group(1)] = raw_message
+                raw_message = None
+        return raw_messages
+    
+    @staticmethod
+    def _expand_sequence_set(sequence_set: bytes) -> List[bytes]:
+        """Expand an IMAP sequence set such as b"1:3,7" into [b"1", b"2", b"3", b"7"]"""
+        numbers = []
+        for item in sequence_set.split(b","):
+            first, _, last = item.partition(b":")
+            if not last:
+                numbers.append(first)
+                continue
+            low, high = sorted((int(first), int(last)))
+            numbers.extend(str(number).encode() for number in range(low, high + 1))
+        return numbers
+    
+    def _search_uids(self, search_criteria: str) -> List[bytes]:
+        """UIDs of the selected mailbox's messages matching the criteria"""
+        if "ESEARCH" in getattr(self.imap, "capabilities", ()):
+            # ESEARCH replies with ranges (1:500,502) instead of listing every UID
+            self.imap.uid("SEARCH", "RETURN", "(ALL)", search_criteria)
+            _, data = self.imap.response("ESEARCH")
+            match = _ESEARCH_ALL_RE.search(data[-1] or b"")
+            return self._expand_sequence_set(match.group(1)) if match else []
+        _, data = self.imap.uid("SEARCH", None, search_criteria)
+        return data[0].split()
+    
+    def _parse_message(self, num: bytes, raw_message: bytes) -> Dict:
+        """Parse a fetched raw message into an email dictionary"""
+        msg = message_from_bytes(raw_message)
+        
+        subject = self._decode_header(msg["Subject"] or "")
+        from_addr = self._decode_header(msg["From"] or "")
+        date_str = msg["Date"]
+        date = None
+        if date_str:
+            try:
+                date = parsedate_to_datetime(date_str)
+            except:
+                pass
+        
+        body = self._parse_email_body(msg)
+        
+        return {
+            # Older versions stored message sequence numbers as IDs; the prefix keeps a
+            # UID from being taken for a saved sequence number when appending
+            "id": "uid:" + (num.decode() if isinstance(num, bytes) else str(num)),
+            "subject": subject,
+            "from": from_addr,
+            "date": date,
+            "body": body,
+            "raw_date": date_str
+        }
+    
+    def _fetch_batches(self, email_ids: List[bytes], progress: tqdm) -> Iterator[List[Tuple[bytes, Optional[bytes]]]]:
+        """
+        Fetch messages with one UID FETCH per batch instead of a round trip per message
+        
+        Yields:
+            Lists of (UID, raw message or None if the server did not return it)
+        """
+        for start in range(0, len(email_ids), FETCH_BATCH_SIZE):
+            batch = email_ids[start:start + FETCH_BATCH_SIZE]
+            try:
+                # BODY.PEEK[] is the full message, like RFC822, without marking it as read
+                _, msg_data = self.imap.uid("FETCH", b",".join(batch), "(UID BODY.PEEK[])")
+                raw_messages = self._split_fetch_response(msg_data)
+            except Exception as e:
+                print(f"Error fetching emails {batch[0].decode()}-{batch[-1].decode()}: {e}")
+                progress.update(len(batch))
+                continue
+            yield [(num, raw_messages.get(num)) for num in batch]
+    
+    def _parse_batches(self, batches: Iterator[List[Tuple[bytes, Optional[bytes]]]],
+                       workers: int) -> Iterator[Tuple[bytes, object]]:
+        """
+        Parse fetched batches in order, in worker processes when workers > 1
+        
+        Yields:
+            Tuples of (UID, email dictionary or the exception raised parsing it)
+        """
+        if workers <= 1:
+            for batch in batches:
+                yield from self._parse_batch(batch)
+            return
+        
+        # Workers parse earlier batches while the next one is being fetched
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        try:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(_parse_batch_in_worker, batch))
+                if len(pending) > workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+    
+    def _parse_batch(self, batch: List[Tuple[bytes, Optional[bytes]]]) -> List[Tuple[bytes, object]]:
+        """Parse fetched raw messages, returning the exception in place of any that fails"""
+        results = []
+        for num, raw_message in batch:
+            try:
+                if raw_message is None:
+                    raise ValueError("message not returned by server")
+                results.append((num, self._parse_message(num, raw_message)))
+            except Exception as e:
+                results.append((num, e))
+        return results
+    
+    def fetch_emails(self, search_criteria: str = "ALL", limit: Optional[int] = None,
+                     workers: Optional[int] = None) -> List[Dict]:
+        """
+        Fetch emails from mailbox
+        
+        Args:
+            search_criteria: IMAP SEARCH criteria
+            limit: Maximum number of emails to fetch
+            workers: Number of processes parsing messages (default: one per CPU)
+        """
         if not self.imap:
             if not self.connect():
                 return []
         
         try:
             self.imap.select("INBOX")
-            _, message_numbers = self.imap.search(None, search_criteria)
-            
-            email_ids = message_numbers[0].split()
+            # UIDs, unlike message numbers, stay the same across sessions and expunges
+            email_ids = self._search_uids(search_criteria)
             if limit:
                 email_ids = email_ids[:limit]
             
             emails = []
-            total = len(email_ids)
+            workers = workers or os.cpu_count() or 1
+            if len(email_ids) <= FETCH_BATCH_SIZE:
+                # A single FETCH leaves no network wait to overlap parsing with
+                workers = 1
             
-            for num in tqdm(email_ids, desc="Fetching emails", unit="email"):
-                try:
-                    _, msg_data = self.imap.fetch(num, "(RFC822)")
-                    msg = message_from_bytes(msg_data[0][1])
-                    
-                    subject = self._decode_header(msg["Subject"] or "")
-                    from_addr = self._decode_header(msg["From"] or "")
-                    date_str = msg["Date"]
-                    date = None
-                    if date_str:
-                        try:
-                            date = parsedate_to_datetime(date_str)
-                        except:
-                            pass
-                    
-                    body = self._parse_email_body(msg)
-                    
-                    emails.append({
-                        "id": num.decode() if isinstance(num, bytes) else str(num),
-                        "subject": subject,
-                        "from": from_addr,
-                        "date": date,
-                        "body": body,
-                        "raw_date": date_str
-                    })
-                except Exception as e:
-                    print(f"Error parsing email {num}: {e}")
-                    continue
+            with tqdm(total=len(email_ids), desc="Fetching emails", unit="email") as progress:
+                batches = self._fetch_batches(email_ids, progress)
+                for num, result in self._parse_batches(batches, workers):
+                    if isinstance(result, Exception):
+                        print(f"Error parsing email {num}: {result}")
+                    else:
+                        emails.append(result)
+                    progress.update(1)
             
             return emails
         except Exception as e:
@@ -151,10 +311,38 @@ class EmailParser:
                        "position", "candidate", "opportunity", "apply", "career"]
         
         # Build search query
-        search_query = " OR ".join([f'(BODY "{keyword}")' for keyword in keywords])
-        search_query += " OR " + " OR ".join([f'(SUBJECT "{keyword}")' for keyword in keywords])
+        search_keys = [f'BODY "{keyword}"' for keyword in keywords]
+        search_keys += [f'SUBJECT "{keyword}"' for keyword in keywords]
         
         # Fetch emails
-        emails = self.fetch_emails(search_criteria=f"({search_query})", limit=limit)
+        emails = self.fetch_emails(search_criteria=self._or_search_query(search_keys), limit=limit)
         return emails
+    
+    @classmethod
+    def _or_search_query(cls, search_keys: List[str]) -> str:
+        """
+        Combine IMAP search keys into one query matching any of them
+        
+        IMAP's OR takes exactly two keys before them (OR a b), so the keys are
+        nested as a balanced tree, keeping it shallow for servers that limit depth.
+        """
+        if len(search_keys) == 1:
+            return search_keys[0]
+        middle = len(search_keys) // 2
+        return (f"(OR {cls._or_search_query(search_keys[:middle])} "
+                f"{cls._or_search_query(search_keys[middle:])})")
+
+
+# Parser used by each worker process; it only parses, so it never connects
+_worker_parser = None
+
+
+def _init_worker():
+    """Create the worker process's parser"""
+    global _worker_parser
+    _worker_parser = EmailParser()
+
 
+def _parse_batch_in_worker(batch: List[Tuple[bytes, Optional[bytes]]]) -> List[Tuple[bytes, object]]:
+    """Parse a fetched batch in a worker process"""
+    return _worker_parser._parse_batch(batch)
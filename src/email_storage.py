@@ -1,80 +1,185 @@
 """Email data storage and retrieval from input folder"""
 
-import json
+import hashlib
+import mmap
+import os
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+import orjson
 from tqdm import tqdm
 
 from src.config import INPUT_DIR
 
 
+# Emails between progress bar updates
+PROGRESS_BATCH_SIZE = 256
+
+# In files indented by save_emails (or json.dump with indent=2) only the top-level
+# metadata key starts a line with this, since JSON strings cannot hold raw newlines
+_METADATA_KEY = b'\n  "metadata": '
+_METADATA_END = b'\n  }'
+
+# In the same files the email list starts on a line of its own, and each email in it
+# starts and ends on a line at this indent, with deeper lines in between
+_EMAILS_KEY = b'  "emails": ['
+_ITEM_INDENT = b"    "
+
+
+def _iter_email_list(f: BinaryIO) -> Iterator[Dict]:
+    """
+    Yield the emails of a storage file, wherever "emails" is among the top-level keys
+    
+    Files indented by save_emails (or json.dump with indent=2) are read line by line
+    and each email is decoded on its own, so the file is never held in memory as a
+    whole. Files in any other layout are decoded in one go.
+    """
+    if f.readline().rstrip() != b"{" or f.readline()[:3] != b'  "':
+        f.seek(0)
+        data = orjson.loads(f.read())
+        if not isinstance(data, dict):
+            raise ValueError("storage file does not hold a JSON object")
+        yield from data.get("emails", [])
+        return
+    
+    f.seek(0)
+    in_list = False
+    item = []
+    last_line = b""
+    for line in f:
+        line = line.rstrip()
+        if not line:
+            continue
+        last_line = line
+        if not in_list:
+            in_list = line == _EMAILS_KEY
+        elif line[:4] == _ITEM_INDENT and line[4:5] != b" ":
+            # A line at the item indent opens an email, closes it or holds all of it
+            item.append(line)
+            if len(item) > 1 or line.rstrip(b",")[-1:] not in (b"{", b"["):
+                yield orjson.loads(b"\n".join(item).rstrip(b","))
+                item = []
+        elif item:
+            item.append(line)
+        else:
+            # The closing bracket of the email list
+            in_list = False
+    if in_list or last_line != b"}":
+        raise orjson.JSONDecodeError("Storage file ends before its closing brace", "", 0)
+
+
+def _iter_email_lines(f) -> Iterator[Dict]:
+    """Yield the emails of a JSON Lines storage file, one per non-blank line"""
+    for line in f:
+        if line.strip():
+            yield orjson.loads(line)
+
+
+def _ids_digest(ids: Iterable) -> str:
+    """Hash of a set of email IDs, the same whatever their order or repetition"""
+    digest = hashlib.blake2b(digest_size=16)
+    for email_id in sorted({str(email_id) for email_id in ids}):
+        digest.update(email_id.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _parse_stored_date(value: str) -> datetime:
+    """Parse an ISO format date as saved by save_emails or written by other tools"""
+    try:
+        # Dates saved by datetime.isoformat never end in Z, so most need no rewriting
+        return datetime.fromisoformat(value)
+    except ValueError:
+        # Before Python 3.11 fromisoformat does not accept a Z suffix
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _iter_with_progress(emails: Iterable[Dict], desc: str) -> Iterator[Dict]:
+    """Yield emails under a progress bar advanced once per batch rather than per email"""
+    emails = iter(emails)
+    with tqdm(desc=desc, unit="email") as progress:
+        while True:
+            batch = list(islice(emails, PROGRESS_BATCH_SIZE))
+            if not batch:
+                return
+            yield from batch
+            progress.update(len(batch))
+
+
 class EmailStorage:
     """Handles saving and loading emails to/from input folder"""
     
+    # Input folders already created by this process
+    _ready_dirs = set()
+    
     def __init__(self, storage_file: str = "emails.json"):
         """Initialize email storage"""
-        INPUT_DIR.mkdir(exist_ok=True)
+        if INPUT_DIR not in EmailStorage._ready_dirs:
+            INPUT_DIR.mkdir(exist_ok=True)
+            EmailStorage._ready_dirs.add(INPUT_DIR)
         self.storage_file = INPUT_DIR / storage_file
+        # A .jsonl file holds one email per line and no metadata, so it can be read
+        # line by line or split into line ranges by other tools
+        self.jsonl = self.storage_file.suffix == ".jsonl"
     
-    def save_emails(self, emails: List[Dict], overwrite: bool = True) -> bool:
+    def save_emails(self, emails: Iterable[Dict], overwrite: bool = True) -> bool:
         """
         Save emails to JSON file in input folder
         
+        Emails are written as they are read, so a generator of emails (e.g. from
+        EmailImporter.iter_auto_import) is never held in memory all at once.
+        Appending a list of exactly the emails already saved leaves the file untouched.
+        
         Args:
-            emails: List of email dictionaries to save
+            emails: Email dictionaries to save
             overwrite: If True, overwrite existing file. If False, append.
         
         Returns:
             True if successful, False otherwise
         """
+        # Write next to the target and swap it in at the end, so a failed or
+        # interrupted save leaves the previous file intact
+        temp_file = self.storage_file.with_name(self.storage_file.name + ".tmp")
         try:
-            # Convert datetime objects to ISO format strings for JSON serialization
-            emails_to_save = []
-            for email_data in tqdm(emails, desc="Saving emails", unit="email"):
-                email_dict = email_data.copy()
-                
-                # Convert date to ISO string if it's a datetime object
-                if "date" in email_dict and email_dict["date"]:
-                    if isinstance(email_dict["date"], datetime):
-                        email_dict["date"] = email_dict["date"].isoformat()
-                
-                emails_to_save.append(email_dict)
+            if not overwrite and isinstance(emails, list) and self._already_saved(emails):
+                print(f"[INFO] All {len(emails)} emails are already saved in {self.storage_file.name}")
+                return True
             
-            # Prepare data structure
-            data = {
-                "metadata": {
-                    "export_date": datetime.now().isoformat(),
-                    "total_emails": len(emails_to_save),
-                    "source": "email_fetch"
-                },
-                "emails": emails_to_save
-            }
+            print(f"[INFO] Writing emails to {self.storage_file.name}...")
             
-            # Load existing data if appending
+            # Copy existing emails first if appending, collecting their IDs as they are copied
+            existing_ids = set()
+            existing_emails = ()
             if not overwrite and self.storage_file.exists():
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    existing_emails = existing_data.get("emails", [])
-                    
-                    # Merge emails (avoid duplicates by ID)
-                    existing_ids = {email.get("id") for email in existing_emails}
-                    new_emails = [
-                        email for email in emails_to_save 
-                        if email.get("id") not in existing_ids
-                    ]
-                    emails_to_save = existing_emails + new_emails
-                    data["emails"] = emails_to_save
-                    data["metadata"]["total_emails"] = len(emails_to_save)
+                existing_emails = self._iter_existing(existing_ids)
             
-            # Save to file
-            print(f"[INFO] Writing {len(emails_to_save)} emails to file...")
+            # Merge emails (avoid duplicates by ID); every existing ID has been
+            # collected by the time the first new email is checked
+            # orjson writes datetime dates as ISO format strings, so emails are saved as they are
+            new_emails = (
+                email for email in _iter_with_progress(emails, "Saving emails")
+                if email.get("id") not in existing_ids
+            )
             try:
-                with open(self.storage_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                print(f"[SUCCESS] File saved successfully")
+                with open(temp_file, 'wb') as f:
+                    if self.jsonl:
+                        total_emails = self._write_email_lines(f, chain(existing_emails, new_emails))
+                    else:
+                        saved_ids = []
+                        
+                        def track_ids(emails):
+                            for email_data in emails:
+                                saved_ids.append(email_data.get("id"))
+                                yield email_data
+                        
+                        f.write(b'{\n  "emails": [')
+                        total_emails = self._write_email_list(f, track_ids(chain(existing_emails, new_emails)))
+                        self._write_metadata(f, total_emails, _ids_digest(saved_ids))
+                os.replace(temp_file, self.storage_file)
+                print(f"[SUCCESS] File saved successfully ({total_emails} emails)")
                 return True
-            except Exception as write_error:
+            except OSError as write_error:
                 print(f"[ERROR] Error writing to file: {write_error}")
                 import traceback
                 traceback.print_exc()
@@ -88,6 +193,63 @@ class EmailStorage:
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+    
+    def _iter_file_emails(self, f) -> Iterator[Dict]:
+        """Emails of the open storage file, in whichever format it is saved"""
+        return _iter_email_lines(f) if self.jsonl else _iter_email_list(f)
+    
+    def _iter_existing(self, ids: set) -> Iterator[Dict]:
+        """Stream the emails already in the storage file, adding their IDs to ids"""
+        with open(self.storage_file, 'rb') as f:
+            for email_data in self._iter_file_emails(f):
+                ids.add(email_data.get("id"))
+                yield email_data
+    
+    @staticmethod
+    def _write_email_list(f: BinaryIO, emails: Iterable[Dict]) -> int:
+        """Write emails as the body of an indented JSON array, one at a time, returning the count"""
+        count = 0
+        for email_dict in emails:
+            f.write(b",\n    " if count else b"\n    ")
+            # JSON strings never contain raw newlines, so this only re-indents the structure
+            f.write(orjson.dumps(email_dict, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n    "))
+            count += 1
+        f.write(b"\n  ]" if count else b"]")
+        return count
+    
+    def _already_saved(self, emails: List[Dict]) -> bool:
+        """Check if the storage file holds emails with exactly these IDs"""
+        if not self.storage_file.exists():
+            return False
+        metadata = self.get_metadata() or {}
+        return metadata.get("ids_digest") == _ids_digest(email.get("id") for email in emails)
+    
+    @staticmethod
+    def _write_metadata(f: BinaryIO, total_emails: int, ids_digest: str):
+        """Write the metadata entry and close the top-level object"""
+        metadata = {
+            "export_date": datetime.now().isoformat(),
+            "total_emails": total_emails,
+            "source": "email_fetch",
+            # Lets a later append of the same emails skip rewriting the file
+            "ids_digest": ids_digest
+        }
+        f.write(b',\n  "metadata": ')
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+        f.write(b"\n}")
+    
+    @staticmethod
+    def _write_email_lines(f: BinaryIO, emails: Iterable[Dict]) -> int:
+        """Write emails one per line (JSON Lines), returning the count"""
+        count = 0
+        for email_dict in emails:
+            f.write(orjson.dumps(email_dict))
+            f.write(b"\n")
+            count += 1
+        return count
     
     def load_emails(self, months: int = None, year: int = None) -> Optional[List[Dict]]:
         """
@@ -100,12 +262,14 @@ class EmailStorage:
         Returns:
             List of email dictionaries, or None if file doesn't exist or error occurs
         """
-        if not self.storage_file.exists():
+        # One stat both checks the file exists and gives its size
+        try:
+            file_size = self.storage_file.stat().st_size / (1024*1024)
+        except FileNotFoundError:
             return None
         
         try:
             print(f"[INFO] Loading emails from {self.storage_file.name}...")
-            file_size = self.storage_file.stat().st_size / (1024*1024)
             print(f"[INFO] File size: {file_size:.2f} MB")
             
             if months is not None or year is not None:
@@ -116,17 +280,6 @@ class EmailStorage:
                     filter_desc.append(f"last {months} months")
                 print(f"[INFO] Filtering emails: {', '.join(filter_desc)}")
             
-            print("[INFO] Reading JSON file...")
-            with open(self.storage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            all_emails = data.get("emails", [])
-            print(f"[INFO] Found {len(all_emails)} emails in file")
-            
-            if len(all_emails) == 0:
-                print("[WARNING] No emails found in file")
-                return []
-            
             # Filter emails during loading if date criteria provided
             now = datetime.now()
             from dateutil.relativedelta import relativedelta
@@ -135,48 +288,63 @@ class EmailStorage:
             cutoff_date = None
             if months is not None:
                 cutoff_date = now - relativedelta(months=months)
+            # Dates saved with a UTC offset are compared against the cutoff in local time
+            aware_cutoff = cutoff_date.astimezone() if cutoff_date else None
+            # Stored dates are ISO strings starting with the year, so emails from
+            # other years are dropped without parsing their date
+            year_prefix = f"{year:04d}" if year is not None else None
             
-            print("[INFO] Processing and filtering emails...")
+            print("[INFO] Reading and filtering emails...")
+            total_count = 0
             processed_count = 0
             error_count = 0
             filtered_out = 0
             
-            for email_data in tqdm(all_emails, desc="Loading emails", unit="email"):
-                try:
-                    # Convert date string to datetime
-                    email_date = None
-                    if "date" in email_data and email_data["date"]:
-                        try:
-                            if isinstance(email_data["date"], str):
-                                email_data["date"] = datetime.fromisoformat(email_data["date"].replace('Z', '+00:00'))
-                            email_date = email_data["date"]
-                        except (ValueError, TypeError):
-                            # If parsing fails, skip date filtering for this email
-                            pass
-                    
-                    # Apply date filtering if criteria provided
-                    if email_date:
-                        # Filter by year
-                        if year is not None and email_date.year != year:
+            # Emails of indented and .jsonl files are decoded one at a time, so those
+            # files are never held in memory as a whole
+            with open(self.storage_file, 'rb') as f:
+                for email_data in _iter_with_progress(self._iter_file_emails(f), "Loading emails"):
+                    total_count += 1
+                    try:
+                        if (year_prefix and isinstance(email_data.get("date"), str)
+                                and not email_data["date"].startswith(year_prefix)):
                             filtered_out += 1
                             continue
                         
-                        # Filter by months
-                        if cutoff_date and email_date < cutoff_date:
+                        # Convert date string to datetime
+                        email_date = None
+                        if "date" in email_data and email_data["date"]:
+                            try:
+                                if isinstance(email_data["date"], str):
+                                    email_data["date"] = _parse_stored_date(email_data["date"])
+                                email_date = email_data["date"]
+                            except (ValueError, TypeError):
+                                # If parsing fails, skip date filtering for this email
+                                pass
+                        
+                        # Apply date filtering if criteria provided
+                        if email_date:
+                            # Filter by year
+                            if year is not None and email_date.year != year:
+                                filtered_out += 1
+                                continue
+                            
+                            # Filter by months
+                            if cutoff_date and email_date < (aware_cutoff if email_date.tzinfo else cutoff_date):
+                                filtered_out += 1
+                                continue
+                        elif (months is not None or year is not None):
+                            # If we have date filters but email has no valid date, skip it
                             filtered_out += 1
                             continue
-                    elif (months is not None or year is not None):
-                        # If we have date filters but email has no valid date, skip it
-                        filtered_out += 1
+                        
+                        emails.append(email_data)
+                        processed_count += 1
+                    except Exception as e:
+                        error_count += 1
+                        if error_count <= 5:
+                            print(f"\n[WARNING] Error processing email: {e}")
                         continue
-                    
-                    emails.append(email_data)
-                    processed_count += 1
-                except Exception as e:
-                    error_count += 1
-                    if error_count <= 5:
-                        print(f"\n[WARNING] Error processing email: {e}")
-                    continue
             
             if filtered_out > 0:
                 print(f"[INFO] Filtered out {filtered_out} emails based on date criteria")
@@ -184,7 +352,11 @@ class EmailStorage:
             if error_count > 0:
                 print(f"\n[WARNING] {error_count} emails had processing errors")
             
-            print(f"[SUCCESS] Loaded {len(emails)} emails (from {len(all_emails)} total)")
+            if total_count == 0:
+                print("[WARNING] No emails found in file")
+                return []
+            
+            print(f"[SUCCESS] Loaded {len(emails)} emails (from {total_count} total)")
             
             return emails
             
@@ -194,7 +366,7 @@ class EmailStorage:
         except FileNotFoundError:
             print(f"[ERROR] File not found: {self.storage_file}")
             return None
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"[ERROR] Invalid JSON file: {e}")
             print(f"[ERROR] The file may be corrupted")
             return None
@@ -206,13 +378,26 @@ class EmailStorage:
             return None
     
     def get_metadata(self) -> Optional[Dict]:
-        """Get metadata from stored emails file"""
-        if not self.storage_file.exists():
+        """Get metadata from stored emails file (None for .jsonl files, which have none)"""
+        if self.jsonl or not self.storage_file.exists():
             return None
         
         try:
-            with open(self.storage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(self.storage_file, 'rb') as f:
+                # Map the file instead of reading it, so only the pages around the
+                # metadata of an indented file are touched
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    start = mapped.rfind(_METADATA_KEY)
+                    end = mapped.find(_METADATA_END, start) if start != -1 else -1
+                    if end != -1:
+                        try:
+                            return orjson.loads(mapped[start + len(_METADATA_KEY):end + len(_METADATA_END)])
+                        except orjson.JSONDecodeError:
+                            # The closing brace belonged to something else
+                            pass
+                    # Not indented: parse the whole file straight from the mapping
+                    with memoryview(mapped) as view:
+                        data = orjson.loads(view)
             return data.get("metadata")
         except Exception as e:
             print(f"Error reading metadata: {e}")
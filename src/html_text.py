@@ -0,0 +1,79 @@
+"""Fast HTML-to-text extraction with lxml"""
+
+import threading
+
+from lxml import etree
+
+# Text inside these elements is not shown on the page
+HIDDEN_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+
+class _TextCollector:
+    """
+    lxml parser target that keeps the visible text of an HTML document
+    
+    Collects the same strings as BeautifulSoup(html, 'lxml').get_text(separator=' ', strip=True)
+    without building a document tree.
+    """
+    
+    def __init__(self):
+        self.strings = []
+        self.pending = []
+        self.hidden_depth = 0
+    
+    def _flush(self):
+        # Text between two markup events forms one string
+        if self.pending:
+            text = "".join(self.pending).strip()
+            self.pending = []
+            if text:
+                self.strings.append(text)
+    
+    def start(self, tag, attrib, nsmap=None):
+        self._flush()
+        if self.hidden_depth or tag in HIDDEN_TEXT_TAGS:
+            self.hidden_depth += 1
+    
+    def end(self, tag):
+        self._flush()
+        if self.hidden_depth:
+            self.hidden_depth -= 1
+    
+    def data(self, data):
+        if not self.hidden_depth:
+            self.pending.append(data)
+    
+    def comment(self, text):
+        self._flush()
+    
+    def pi(self, target, data=None):
+        self._flush()
+    
+    def doctype(self, *args):
+        self._flush()
+    
+    def close(self) -> str:
+        self._flush()
+        text = " ".join(self.strings)
+        # Ready for the next document fed to the same parser
+        self.strings = []
+        self.hidden_depth = 0
+        return text
+
+
+# lxml parsers are not thread-safe, so each thread keeps its own
+_local = threading.local()
+
+
+def html_to_text(html: str) -> str:
+    """Extract visible text from HTML, separating text blocks with single spaces"""
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = etree.HTMLParser(target=_TextCollector(), recover=True)
+    try:
+        parser.feed(html)
+        return parser.close()
+    except Exception:
+        # Don't reuse a parser left in the middle of a document
+        _local.parser = None
+        raise
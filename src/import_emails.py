@@ -2,6 +2,7 @@
 
 import sys
 import argparse
+from itertools import chain
 from pathlib import Path
 
 from src.config import INPUT_DIR
@@ -16,7 +17,7 @@ def import_emails(source_path: str = None, format_type: str = None, output_file:
     Args:
         source_path: Path to .mbox file (optional, auto-detects if not provided)
         format_type: Not used (kept for compatibility)
-        output_file: Output filename (default: emails.json)
+        output_file: Output filename (default: emails.json, or .jsonl for one email per line)
     """
     print("=" * 60)
     print("Email Import Tool")
@@ -26,8 +27,6 @@ def import_emails(source_path: str = None, format_type: str = None, output_file:
     importer = EmailImporter()
     storage = EmailStorage(storage_file=output_file)
     
-    emails = []
-    
     if source_path:
         # Import from specific file/directory
         source = Path(source_path)
@@ -37,7 +36,7 @@ def import_emails(source_path: str = None, format_type: str = None, output_file:
         
         if source.suffix == ".mbox":
             print(f"Importing from mbox file: {source.name}")
-            emails = importer.import_from_mbox(source)
+            emails = importer.iter_from_mbox(source)
         elif source.is_dir():
             print("Error: Directories are not supported. Please specify the .mbox file path.")
             sys.exit(1)
@@ -48,17 +47,9 @@ def import_emails(source_path: str = None, format_type: str = None, output_file:
         # Auto-import from input folder
         print("Auto-detecting .mbox files in input folder...")
         print("(This may take a moment if you have many files)")
-        emails = importer.auto_import()
-    
-    if not emails:
-        print("\n[ERROR] No emails imported. Please check your files.")
-        sys.exit(1)
+        emails = importer.iter_auto_import()
     
-    print(f"\n[SUCCESS] Total emails imported: {len(emails)}")
-    print()
-    
-    # Save to emails.json
-    print(f"Saving to {storage.storage_file}...")
+    # Emails are saved as they are imported, so decide how to save before importing
     overwrite = not storage.file_exists()
     if storage.file_exists():
         try:
@@ -69,10 +60,29 @@ def import_emails(source_path: str = None, format_type: str = None, output_file:
             print("[INFO] Non-interactive mode: overwriting existing file")
             overwrite = True
     
-    success = storage.save_emails(emails, overwrite=overwrite)
+    # Leave any existing file untouched when nothing can be imported
+    first_email = next(emails, None)
+    if first_email is None:
+        print("\n[ERROR] No emails imported. Please check your files.")
+        sys.exit(1)
+    
+    imported_count = 0
+    
+    def count_imported(emails):
+        nonlocal imported_count
+        for email_data in emails:
+            imported_count += 1
+            yield email_data
+    
+    # Save to emails.json while importing
+    print(f"Saving to {storage.storage_file}...")
+    success = storage.save_emails(count_imported(chain([first_email], emails)), overwrite=overwrite)
+    
+    print(f"\n[SUCCESS] Total emails imported: {imported_count}")
+    print()
     
     if success:
-        print(f"[SUCCESS] Saved {len(emails)} emails to {storage.storage_file}")
+        print(f"[SUCCESS] Saved {imported_count} emails to {storage.storage_file}")
         print()
         print("=" * 60)
         print("Import complete!")
@@ -98,7 +108,7 @@ def main():
     parser.add_argument(
         "--output",
         default="emails.json",
-        help="Output filename (default: emails.json)"
+        help="Output filename (default: emails.json); a .jsonl name saves one email per line"
     )
     
     args = parser.parse_args()
@@ -1,17 +1,33 @@
 """Main entry point for the application"""
 
+import os
 import sys
 import argparse
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from tqdm import tqdm
 
-from src.config import INPUT_DIR, OUTPUT_DIR
-from src.email_parser import EmailParser
-from src.email_storage import EmailStorage
-from src.classifier import EmailClassifier
-from src.analytics import AnalyticsGenerator
+from src.config import INPUT_DIR, OUTPUT_DIR, ensure_dirs
+
+# The parser, storage, classifier and analytics modules pull in pandas, numpy, tqdm
+# and orjson, so they are imported where they are used to keep --help and early
+# exits fast.
+
+
+def _in_year(email_date, year: int) -> bool:
+    """
+    Check if a date falls in the year, in its own local time
+    
+    This is the year EmailStorage.load_emails filters on: 2024-01-01T00:30+02:00
+    is in 2024, even though it is still 2023 in UTC. ISO date strings start with
+    that year, so strings are checked without parsing them; the month and day
+    digits are checked too, so a string that only starts with the year is not kept.
+    """
+    if isinstance(email_date, str):
+        return (email_date.startswith(f"{year:04d}-") and email_date[7:8] == "-"
+                and email_date[5:7].isdigit() and email_date[8:10].isdigit())
+    return isinstance(email_date, datetime) and email_date.year == year
 
 
 def filter_emails_by_date(emails: list, months: int = None, year: int = None) -> list:
@@ -19,37 +35,58 @@ def filter_emails_by_date(emails: list, months: int = None, year: int = None) ->
     if not emails:
         return emails
     
-    filtered = []
-    now = datetime.now()
+    # The year is checked without parsing any date; only a months filter needs them parsed
+    if year is not None:
+        emails = [email_data for email_data in emails if _in_year(email_data.get("date"), year)]
+    if not emails or months is None:
+        return emails
     
-    for email_data in emails:
-        email_date = email_data.get("date")
-        
-        # Skip if no date
-        if not email_date:
-            continue
-        
-        # Convert ISO string to datetime if needed
-        if isinstance(email_date, str):
-            try:
-                email_date = datetime.fromisoformat(email_date.replace('Z', '+00:00'))
-            except:
-                continue
-        
-        # Filter by year
-        if year is not None:
-            if email_date.year != year:
-                continue
-        
-        # Filter by months
-        if months is not None:
-            cutoff_date = now - relativedelta(months=months)
-            if email_date < cutoff_date:
-                continue
-        
-        filtered.append(email_data)
+    import numpy as np
+    import pandas as pd
+    
+    # Parse all dates in one vectorized call; emails without a valid date become NaT,
+    # which is never within the cutoff
+    dates = pd.to_datetime(
+        pd.Series([email_data.get("date") for email_data in emails], dtype=object),
+        utc=True, errors="coerce", format="ISO8601"
+    )
+    mask = dates >= pd.Timestamp.now(tz="UTC") - pd.DateOffset(months=months)
     
-    return filtered
+    return [emails[i] for i in np.flatnonzero(mask.to_numpy())]
+
+
+def _iter_batches(emails: list, size: int):
+    """Yield consecutive lists of up to size emails"""
+    emails = iter(emails)
+    while True:
+        batch = list(islice(emails, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _classify_with_bisect(classifier, batch: list, workers: int, pool, errors: list) -> list:
+    """
+    Classify a batch, splitting it in half whenever classifying it fails
+    
+    A bad email is isolated in a logarithmic number of retries instead of retrying
+    every email in the batch on its own. Emails that fail alone are left out and
+    their errors appended to errors.
+    """
+    try:
+        if len(batch) == 1:
+            # A single email is classified here rather than sent to a worker
+            return [classifier.classify_one(batch[0], inplace=True)]
+        return classifier.classify_emails(batch, workers=workers, executor=pool, inplace=True)
+    except Exception as e:
+        if len(batch) == 1:
+            errors.append(e)
+            if len(errors) <= 5:
+                print(f"\n[WARNING] Error classifying email: {str(e)[:100]}")
+            return []
+        middle = len(batch) // 2
+        return (_classify_with_bisect(classifier, batch[:middle], workers, pool, errors)
+                + _classify_with_bisect(classifier, batch[middle:], workers, pool, errors))
 
 
 def prompt_for_date_filter() -> tuple:
@@ -114,21 +151,31 @@ def prompt_for_date_filter() -> tuple:
         return None, None
 
 
-def load_emails_from_input(months: int = None, year: int = None, prompt_if_missing: bool = True) -> list:
-    """Load emails from input folder with optional date filtering"""
+def load_emails_from_input(months: int = None, year: int = None, prompt_if_missing: bool = True) -> tuple:
+    """
+    Load emails from input folder with optional date filtering
+    
+    Returns:
+        Tuple of (emails, or None on failure, and whether a date filter was applied,
+        given or chosen at the prompt)
+    """
+    from src.email_storage import EmailStorage
+    
     storage = EmailStorage()
     
-    if not storage.file_exists():
+    # One stat both checks the file exists and gives its size
+    try:
+        file_size = storage.storage_file.stat().st_size / (1024*1024)
+    except FileNotFoundError:
         print(f"✗ No emails found in {storage.storage_file}")
         print()
         print("  To import emails, run:")
         print("    python -m src.import_emails")
         print("  This will auto-detect .mbox files in the input/ folder")
-        return None
+        return None, False
     
     # If no date filter provided and we should prompt, ask user
     if (months is None and year is None) and prompt_if_missing:
-        file_size = storage.storage_file.stat().st_size / (1024*1024)
         if file_size > 50:  # Only prompt for larger files (> 50MB)
             months, year = prompt_for_date_filter()
     
@@ -142,7 +189,7 @@ def load_emails_from_input(months: int = None, year: int = None, prompt_if_missi
     else:
         print(f"[ERROR] Failed to load emails from {storage.storage_file}")
     
-    return emails
+    return emails, months is not None or year is not None
 
 
 def fetch_emails_from_server() -> list:
@@ -155,6 +202,8 @@ def fetch_emails_from_server() -> list:
         print("See README.md for security instructions")
         return None
     
+    from src.email_parser import EmailParser
+    
     print("Step 1: Connecting to email server...")
     parser = EmailParser()
     
@@ -206,8 +255,14 @@ def main():
         default=None,
         help="Filter emails from a specific year (e.g., --year 2025)"
     )
+    parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="Classify fetched emails without saving them to the input folder"
+    )
     
     args = parser.parse_args()
+    ensure_dirs()
     
     print("=" * 60)
     print("Sisifus Analytics - Job Application Email Parser")
@@ -222,69 +277,110 @@ def main():
             sys.exit(1)
         # Only prompt if no CLI args provided for date filtering
         prompt_for_filter = (args.months is None and args.year is None)
-        emails = load_emails_from_input(months=args.months, year=args.year, prompt_if_missing=prompt_for_filter)
+        emails, date_filtered = load_emails_from_input(
+            months=args.months, year=args.year, prompt_if_missing=prompt_for_filter
+        )
         if not emails:
             sys.exit(1)
     else:
+        if args.extract_only and args.no_save:
+            print("ERROR: --extract-only cannot be used with --no-save")
+            sys.exit(1)
         emails = fetch_emails_from_server()
         if not emails:
             sys.exit(1)
         
-        # Always save fetched emails to input folder
-        print("Saving fetched emails to input folder...")
-        storage = EmailStorage()
-        storage.save_emails(emails, overwrite=False)
-        print(f"[SUCCESS] Saved to {storage.storage_file}")
+        # Save fetched emails to input folder, unless only classifying them this run
+        if args.no_save:
+            print("[INFO] Not saving fetched emails (--no-save)")
+        else:
+            from src.email_storage import EmailStorage
+            
+            print("Saving fetched emails to input folder...")
+            storage = EmailStorage()
+            storage.save_emails(emails, overwrite=False)
+            print(f"[SUCCESS] Saved to {storage.storage_file}")
         print()
         
         if args.extract_only:
             print("Extraction complete. Use --use-input flag to process these emails.")
             return
+        
+        # All fetched emails are saved, but only those in the date range are processed
+        date_filtered = args.months is not None or args.year is not None
+        if date_filtered:
+            emails = filter_emails_by_date(emails, months=args.months, year=args.year)
+            print(f"[INFO] {len(emails)} emails match the date filter")
+            if not emails:
+                sys.exit(1)
     
+    from tqdm import tqdm
+    from src.classifier import ClassificationCache, EmailClassifier, PARALLEL_MIN_EMAILS
+    from src.analytics import AnalyticsGenerator
     
     print("Step 3: Classifying emails...")
     print(f"[INFO] Classifying {len(emails)} emails...")
     classifier = EmailClassifier()
     
-    classified_emails = []
-    error_count = 0
+    # Only emails not classified in an earlier run need classifying
+    cache = ClassificationCache()
+    cache_keys = [cache.key(email_data) for email_data in emails]
+    to_classify = [
+        email_data for email_data, key in zip(emails, cache_keys)
+        if key not in cache.results
+    ]
+    if len(to_classify) < len(emails):
+        print(f"[INFO] Reusing {len(emails) - len(to_classify)} classifications from {cache.cache_file.name}")
+    
+    # Results are written into a list sized up front; slots of emails that failed
+    # or were never reached are trimmed off afterwards
+    newly_classified = [None] * len(to_classify)
+    classified_count = 0
+    errors = []
     
     # Batch process for better performance (1000 emails at a time)
     BATCH_SIZE = 1000
-    total_batches = (len(emails) + BATCH_SIZE - 1) // BATCH_SIZE
+    total_batches = (len(to_classify) + BATCH_SIZE - 1) // BATCH_SIZE
     
     print(f"[INFO] Processing in batches of {BATCH_SIZE} emails ({total_batches} batches)")
     
+    # Batches are split across one pool of worker processes, started once for all of them
+    workers = os.cpu_count() or 1
+    if workers > 1 and len(to_classify) >= PARALLEL_MIN_EMAILS:
+        print(f"[INFO] Using {workers} worker processes")
+        pool = EmailClassifier.create_pool(workers)
+    else:
+        workers, pool = 1, None
+    
     try:
-        for batch_idx in tqdm(range(0, len(emails), BATCH_SIZE), desc="Classifying batches", total=total_batches, unit="batch"):
-            batch = emails[batch_idx:batch_idx + BATCH_SIZE]
-            try:
-                classified = classifier.classify_emails(batch)
-                classified_emails.extend(classified)
-            except Exception as e:
-                # If batch fails, process individually
-                if error_count == 0:
-                    print(f"\n[WARNING] Batch processing failed, processing individually: {str(e)[:100]}")
-                for email_data in batch:
-                    try:
-                        classified = classifier.classify_emails([email_data])
-                        classified_emails.extend(classified)
-                    except Exception as inner_e:
-                        error_count += 1
-                        if error_count <= 5:
-                            print(f"\n[WARNING] Error classifying email: {str(inner_e)[:100]}")
-                        continue
+        with pool or nullcontext():
+            # Redraw at most once a second rather than after every batch
+            with tqdm(total=total_batches, desc="Classifying batches", unit="batch",
+                      mininterval=1.0, smoothing=0) as progress:
+                for batch in _iter_batches(to_classify, BATCH_SIZE):
+                    classified = _classify_with_bisect(classifier, batch, workers, pool, errors)
+                    newly_classified[classified_count:classified_count + len(classified)] = classified
+                    classified_count += len(classified)
+                    progress.update(1)
     except KeyboardInterrupt:
         print(f"\n[INFO] Classification interrupted by user")
-        print(f"[INFO] Successfully classified {len(classified_emails)} emails before interruption")
+        print(f"[INFO] Successfully classified {classified_count} emails before interruption")
     except Exception as e:
         print(f"\n[ERROR] Error during classification: {type(e).__name__}: {e}")
         import traceback
         traceback.print_exc()
     
+    # Keep what was classified, even if interrupted, and put the emails back in their original order
+    del newly_classified[classified_count:]
+    cache.add(newly_classified)
+    # A date filtered run only sees part of the mailbox, so results for the rest are
+    # kept for the next run instead of being pruned
+    cache.save(None if date_filtered else cache_keys)
+    classified_emails = cache.apply(emails, cache_keys)
+    
     print(f"[SUCCESS] Classified {len(classified_emails)} emails")
-    if error_count > 0:
-        print(f"[INFO] {error_count} emails had classification errors")
+    if errors:
+        print(f"[INFO] {len(errors)} emails had classification errors")
     print()
     
     print("Step 4: Generating analytics...")
@@ -0,0 +1,219 @@
+"""Tests for analytics generation"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from src.analytics import AnalyticsGenerator
+
+
+class TestAnalyticsGenerator:
+    """Test cases for AnalyticsGenerator"""
+
+    @pytest.fixture
+    def emails(self):
+        """Create a small set of classified emails"""
+        return [
+            {"company": "Acme", "status": "applied", "confidence": 0.3,
+             "subject": "Application submitted", "date": datetime(2024, 1, 5, tzinfo=timezone.utc)},
+            {"company": "Acme", "status": "interview_1", "confidence": 0.7,
+             "subject": "First Interview", "date": datetime(2024, 2, 1, tzinfo=timezone.utc)},
+            {"company": "Acme", "status": "rejected", "confidence": 0.9,
+             "subject": "Update", "date": datetime(2024, 3, 1, tzinfo=timezone.utc)},
+            {"company": "Globex", "status": "confirmation", "confidence": 0.6,
+             "subject": "Application Confirmation", "date": None},
+            {"company": "Initech", "status": "not_job_related", "confidence": 0.0,
+             "subject": "Newsletter", "date": datetime(2023, 12, 1, tzinfo=timezone.utc)},
+            {"status": "no_reply", "subject": "Career discussion"},
+        ]
+
+    @pytest.fixture
+    def analytics(self, emails):
+        """Create analytics generator instance"""
+        return AnalyticsGenerator(emails)
+
+    def test_stats_counts(self, analytics):
+        """Test status and company counts"""
+        stats = analytics.stats
+        assert stats["total_emails"] == 6
+        assert stats["by_status"]["applied"] == 1
+        assert stats["by_status"]["no_reply"] == 1
+        assert stats["by_company"]["Acme"]["count"] == 3
+        assert stats["by_company"]["Unknown"]["count"] == 1
+
+    def test_stats_unknown_status(self):
+        """Test statuses outside the known vocabulary are still counted"""
+        analytics = AnalyticsGenerator([{"status": "interview_7"}, {"status": "applied"}])
+        assert analytics.stats["by_status"] == {"applied": 1, "interview_7": 1}
+
+    def test_stats_date_range(self, analytics):
+        """Test earliest and latest dates ignore missing values"""
+        date_range = analytics.stats["date_range"]
+        assert date_range["earliest"] == datetime(2023, 12, 1, tzinfo=timezone.utc)
+        assert date_range["latest"] == datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+    def test_stats_date_range_mixed_timezones(self):
+        """Test naive and aware dates are compared on one UTC timeline"""
+        analytics = AnalyticsGenerator([
+            {"date": datetime(2024, 1, 1)},
+            {"date": datetime(2023, 1, 1, tzinfo=timezone.utc)},
+            {"date": None},
+        ])
+        date_range = analytics.stats["date_range"]
+        assert date_range["earliest"] == datetime(2023, 1, 1, tzinfo=timezone.utc)
+        assert date_range["latest"] == datetime(2024, 1, 1)
+
+    def test_applications(self, analytics):
+        """Test per-email application records"""
+        applications = analytics._applications.to_dict("records")
+        assert len(applications) == 6
+        assert applications[0] == {
+            "company": "Acme",
+            "status": "applied",
+            "date": "2024-01-05T00:00:00+00:00",
+            "subject": "Application submitted",
+            "confidence": 0.3,
+        }
+        assert applications[3]["date"] is None
+        assert applications[5]["company"] == "Unknown"
+
+    def test_applications_dates_keep_offsets(self):
+        """Test application dates keep their own offset and microseconds, and naive dates get none"""
+        offset = timezone(timedelta(hours=-5))
+        analytics = AnalyticsGenerator([
+            {"date": datetime(2024, 1, 5, 20, 30, 0, 123456, tzinfo=offset)},
+            {"date": datetime(2024, 1, 6, 8, 15)},
+        ])
+        applications = analytics._applications.to_dict("records")
+        assert applications[0]["date"] == "2024-01-05T20:30:00.123456-05:00"
+        assert applications[1]["date"] == "2024-01-06T08:15:00"
+        assert analytics.generate_summary()["date_range"]["latest"] == applications[1]["date"]
+
+    @pytest.mark.parametrize("zones", [
+        [timezone.utc],
+        [None],
+        [timezone.utc, timezone(timedelta(hours=5, minutes=30)), None, ZoneInfo("America/New_York")],
+    ])
+    def test_applications_dates_match_isoformat(self, zones):
+        """Test dates formatted per time zone match isoformat, in one zone or many, with or without DST"""
+        dates = [
+            datetime(2024, 1, 5, 20, 30, i % 2 * 7, i % 3 * 250, tzinfo=zones[i % len(zones)])
+            + timedelta(days=40 * i)
+            for i in range(12)
+        ]
+        emails = [{"date": date} for date in dates] + [{"date": "not a date"}, {"date": None}]
+        applications = AnalyticsGenerator(emails)._applications
+        assert applications["date"].tolist() == [date.isoformat() for date in dates] + ["not a date", None]
+
+    def test_summary(self, analytics):
+        """Test summary statistics"""
+        summary = analytics.generate_summary()
+        assert summary["total_applications"] == 4
+        assert summary["total_companies"] == 2
+        assert summary["interviews_count"] == 1
+        assert summary["rejected_count"] == 1
+        assert summary["no_reply_count"] == 1
+        assert summary["not_job_related_count"] == 1
+        assert summary["accuracy_percentage"] == 75.0
+        assert summary["date_range"]["earliest"] == "2023-12-01T00:00:00+00:00"
+
+    def test_summary_is_cached(self, analytics, tmp_path, monkeypatch):
+        """Test the summary is computed once and not mutated by save_analytics"""
+        monkeypatch.setattr("src.analytics.ANALYTICS_JSON", tmp_path / "analytics.json")
+        monkeypatch.setattr("src.analytics.ANALYTICS_CSV", tmp_path / "applications.csv")
+        monkeypatch.setattr("src.analytics.SANKEY_HTML", tmp_path / "sankey_diagram.html")
+
+        assert analytics.summary is analytics.summary
+        analytics.save_analytics()
+        assert "applications" not in analytics.summary
+
+    def test_calculate_accuracy(self, analytics):
+        """Test accuracy over all emails"""
+        assert analytics.calculate_accuracy() == 50.0
+
+    def test_empty_emails(self):
+        """Test analytics with no emails"""
+        analytics = AnalyticsGenerator([])
+        summary = analytics.generate_summary()
+        assert summary["total_applications"] == 0
+        assert summary["date_range"] == {"earliest": None, "latest": None}
+        assert analytics.calculate_accuracy() == 0.0
+
+    def test_company_flow(self, analytics):
+        """Test per-company flow uses the highest stage and terminal status"""
+        flows = analytics._get_company_flow()
+        assert flows.loc["Acme", "highest_interview"] == 1
+        assert flows.loc["Acme", "has_rejected"]
+        assert flows.loc["Acme", "final_status"] == "rejected"
+        assert flows.loc["Globex", "final_status"] == "no_reply"
+
+    def test_sankey_diagram(self, analytics):
+        """Test Sankey nodes and links for the company flows"""
+        sankey = analytics.generate_sankey_diagram().data[0]
+        labels = list(sankey.node.label)
+        assert "Rejected (1)" in labels
+        assert "First Interview (1)" in labels
+        assert "Ghosted (2)" in labels
+        assert sum(sankey.link.value) > 0
+
+    def test_sankey_fills_missing_stages(self):
+        """Test skipped interview stages show the count of the next stage reached"""
+        analytics = AnalyticsGenerator([
+            {"company": "Acme", "status": "interview_3"},
+            {"company": "Acme", "status": "rejected"},
+        ])
+        labels = list(analytics.generate_sankey_diagram().data[0].node.label)
+        assert "First Interview (1)" in labels
+        assert "Interview 2 (1)" in labels
+        assert "Interview 3 (1)" in labels
+
+    def test_save_analytics(self, analytics, tmp_path, monkeypatch):
+        """Test analytics files are written and the JSON round-trips"""
+        monkeypatch.setattr("src.analytics.ANALYTICS_JSON", tmp_path / "analytics.json")
+        monkeypatch.setattr("src.analytics.ANALYTICS_CSV", tmp_path / "applications.csv")
+        monkeypatch.setattr("src.analytics.SANKEY_HTML", tmp_path / "sankey_diagram.html")
+
+        summary = analytics.save_analytics()
+
+        with open(tmp_path / "analytics.json", encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["total_applications"] == summary["total_applications"]
+        assert saved["company_details"]["Acme"] == {
+            "count": 3,
+            "statuses": {"applied": 1, "interview_1": 1, "rejected": 1},
+        }
+        assert len(saved["applications"]) == 6
+        assert (tmp_path / "applications.csv").read_text(encoding="utf-8").startswith(
+            "company,status,date,subject,confidence"
+        )
+        assert (tmp_path / "sankey_diagram.html").exists()
+
+    def test_save_analytics_creates_output_dir(self, analytics, tmp_path, monkeypatch):
+        """Test the output folder is created when saving, not on import"""
+        output_dir = tmp_path / "output"
+        monkeypatch.setattr("src.analytics.ANALYTICS_JSON", output_dir / "analytics.json")
+        monkeypatch.setattr("src.analytics.ANALYTICS_CSV", output_dir / "applications.csv")
+        monkeypatch.setattr("src.analytics.SANKEY_HTML", output_dir / "sankey_diagram.html")
+
+        analytics.save_analytics()
+        assert (output_dir / "analytics.json").exists()
+
+    def test_sankey_html_skipped_when_unchanged(self, emails, tmp_path, monkeypatch):
+        """Test the Sankey HTML is only rewritten when the diagram changes"""
+        html_file = tmp_path / "sankey_diagram.html"
+        monkeypatch.setattr("src.analytics.SANKEY_HTML", html_file)
+
+        def write_sankey():
+            analytics = AnalyticsGenerator(emails)
+            return analytics._write_sankey_html(analytics.generate_sankey_diagram())
+
+        assert write_sankey()
+        assert not write_sankey()
+
+        emails.append({"company": "Hooli", "status": "offer", "confidence": 0.9})
+        assert write_sankey()
+
+        html_file.unlink()
+        assert write_sankey()
+        assert html_file.exists()
@@ -1,80 +1,37 @@
 """Tests for email classifier logic"""
 
+import sys
+
+import orjson
 import pytest
-from src.classifier import EmailClassifier
+from src.classifier import ClassificationCache, EmailClassifier, _split_keyword, _tokens_match
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    """Create one classifier instance shared by the module's tests"""
+    return EmailClassifier()
 
 
 class TestEmailClassifier:
     """Test cases for EmailClassifier"""
     
-    @pytest.fixture
-    def classifier(self):
-        """Create classifier instance"""
-        return EmailClassifier()
-    
-    def test_classify_applied(self, classifier):
-        """Test classification of application emails"""
-        subject = "Application submitted"
-        body = "Thank you for applying to our company"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "applied"
-        assert confidence > 0.3
-    
-    def test_classify_confirmation(self, classifier):
-        """Test classification of confirmation emails"""
-        subject = "Application Confirmation"
-        body = "We have received your application for the position"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "confirmation"
-        assert confidence > 0.4
-    
-    def test_classify_interview_1(self, classifier):
-        """Test classification of first interview emails"""
-        subject = "First Interview Invitation"
-        body = "We would like to invite you for a phone screen interview"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "interview_1"
-        assert confidence > 0.4
-    
-    def test_classify_interview_2(self, classifier):
-        """Test classification of second interview emails"""
-        subject = "Second Round Interview"
-        body = "Congratulations, we would like to proceed with a technical interview"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "interview_2"
-        assert confidence > 0.4
-    
-    def test_classify_interview_3(self, classifier):
-        """Test classification of third interview emails"""
-        subject = "Final Interview"
-        body = "We would like to invite you for an onsite interview"
+    @pytest.mark.parametrize("expected_status,subject,body,min_confidence", [
+        ("applied", "Application submitted", "Thank you for applying to our company", 0.3),
+        ("confirmation", "Application Confirmation", "We have received your application for the position", 0.4),
+        ("interview_1", "First Interview Invitation", "We would like to invite you for a phone screen interview", 0.4),
+        ("interview_2", "Second Round Interview", "Congratulations, we would like to proceed with a technical interview", 0.4),
+        ("interview_3", "Final Interview", "We would like to invite you for an onsite interview", 0.4),
+        ("offer", "Job Offer", "We are pleased to offer you the position", 0.5),
+        ("accepted", "Offer Accepted", "I am excited to accept the offer and join your team", 0.5),
+        ("rejected", "Application Status Update", "Unfortunately, we have decided not to move forward with your application", 0.5),
+        ("withdrew", "Withdrawing Application", "I would like to withdraw my application for this position", 0.5),
+    ])
+    def test_classify_status(self, classifier, expected_status, subject, body, min_confidence):
+        """Test each status is recognized from a typical email with enough confidence"""
         status, confidence = classifier.classify_email(subject, body)
-        assert status == "interview_3"
-        assert confidence > 0.4
-    
-    def test_classify_offer(self, classifier):
-        """Test classification of job offer emails"""
-        subject = "Job Offer"
-        body = "We are pleased to offer you the position"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "offer"
-        assert confidence > 0.5
-    
-    def test_classify_accepted(self, classifier):
-        """Test classification of accepted offer emails"""
-        subject = "Offer Accepted"
-        body = "I am excited to accept the offer and join your team"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "accepted"
-        assert confidence > 0.5
-    
-    def test_classify_rejected(self, classifier):
-        """Test classification of rejection emails"""
-        subject = "Application Status Update"
-        body = "Unfortunately, we have decided not to move forward with your application"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "rejected"
-        assert confidence > 0.5
+        assert status == expected_status
+        assert confidence > min_confidence
     
     def test_classify_rejected_variations(self, classifier):
         """Test various rejection email phrasings"""
@@ -93,14 +50,6 @@ class TestEmailClassifier:
             assert status == "rejected", f"Failed for phrase: {phrase}"
             assert confidence > 0.4
     
-    def test_classify_withdrew(self, classifier):
-        """Test classification of withdrawal emails"""
-        subject = "Withdrawing Application"
-        body = "I would like to withdraw my application for this position"
-        status, confidence = classifier.classify_email(subject, body)
-        assert status == "withdrew"
-        assert confidence > 0.5
-    
     def test_rejection_priority(self, classifier):
         """Test that rejection takes priority over other statuses"""
         subject = "Interview Update"
@@ -145,6 +94,49 @@ class TestEmailClassifier:
         assert all("confidence" in email for email in classified)
         assert all("company" in email for email in classified)
     
+    def test_classify_one(self, classifier):
+        """Test a single email is classified like it is in a batch"""
+        email_data = {"subject": "Job Offer", "body": "We offer you", "from": "manager@company.com"}
+        assert classifier.classify_one(email_data) == classifier.classify_emails([email_data])[0]
+        assert "status" not in email_data
+    
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_classify_emails_inplace(self, classifier, workers):
+        """Test inplace classification annotates and returns the given emails"""
+        emails = [
+            {"subject": "Job Offer", "body": "We are pleased to offer you the position"},
+            {"subject": "Newsletter", "body": "Check out our latest products"},
+        ] * 150
+        expected = classifier.classify_emails(emails)
+        assert "status" not in emails[0]
+        
+        classified = classifier.classify_emails(emails, workers=workers, inplace=True)
+        assert classified == expected
+        assert all(result is email_data for result, email_data in zip(classified, emails))
+    
+    def test_classify_multiple_emails_in_workers(self, classifier):
+        """Test classifying in worker processes matches classifying in-process"""
+        emails = [
+            {"subject": "Application submitted", "body": "Thank you", "from": "test@company.com"},
+            {"subject": "First Interview", "body": None, "from": "Jane <hr@company.com>"},
+            {"subject": "Newsletter", "body": "Check out our latest products"},
+        ] * 100
+        
+        assert classifier.classify_emails(emails, workers=2) == classifier.classify_emails(emails)
+    
+    def test_classify_batches_in_shared_pool(self, classifier):
+        """Test one pool from create_pool can classify several batches"""
+        emails = [
+            {"subject": "Application submitted", "body": "Thank you", "from": "test@company.com"},
+            {"subject": "Newsletter", "body": "Check out our latest products"},
+        ] * 150
+        
+        with classifier.create_pool(2) as pool:
+            first = classifier.classify_emails(emails, workers=2, executor=pool)
+            second = classifier.classify_emails(emails[::-1], workers=2, executor=pool)
+        assert first == classifier.classify_emails(emails)
+        assert second == first[::-1]
+    
     def test_no_reply_classification(self, classifier):
         """Test that job-related emails without status match get no_reply"""
         # Use an email that is job-related but doesn't match specific status patterns
@@ -176,5 +168,97 @@ class TestEmailClassifier:
             assert 0.0 <= confidence <= 1.0
             if status not in ["no_reply", "not_job_related"]:
                 assert confidence > 0.0
+    
+    def test_classify_email_is_cached(self, classifier):
+        """Test repeated emails reuse the cached classification"""
+        body = "We are pleased to offer you the position" + " " * 5000
+        # The classifier is shared with other tests, so count hits from an empty cache
+        classifier._classify_cached.cache_clear()
+        first = classifier.classify_email("Job Offer", body)
+        assert classifier.classify_email("Job Offer", body + "past the preview") == first
+        assert classifier._classify_cached.cache_info().hits == 1
+    
+    def test_every_status_has_priority_rule(self, classifier):
+        """Test each keyword status is scored by exactly one priority rule"""
+        ruled = [status for status, _, _ in classifier.STATUS_PRIORITY]
+        assert sorted(ruled) == sorted(classifier.STATUS_KEYWORDS)
+    
+    def test_fast_job_keywords_are_job_keywords(self, classifier):
+        """Test the subject/sender fast path only uses single-token job keywords"""
+        assert classifier.FAST_JOB_KEYWORDS <= set(classifier.job_keywords)
+    
+    def test_keyword_tokens_match_like_regex(self):
+        """Test keyword tokens must appear in order on a single line"""
+        tokens = _split_keyword(r"regret.*to.*inform")
+        assert tokens == ("regret", "to", "inform")
+        assert _tokens_match(tokens, "we regret to inform you")
+        assert not _tokens_match(tokens, "inform you we regret to")
+        assert not _tokens_match(tokens, "we regret\nto inform you")
+        assert _tokens_match(tokens, "regret\nwe regret to inform you")
+        assert _split_keyword(r".*opportunity") == ("opportunity",)
 
 
+class TestClassificationCache:
+    """Test cases for ClassificationCache"""
+    
+    @pytest.fixture
+    def emails(self):
+        """Create a few emails"""
+        return [
+            {"id": "1", "subject": "Job offer", "body": "We are pleased to offer you the position", "from": "hr@acme.com"},
+            {"id": "2", "subject": "Newsletter", "body": None},
+            {"id": "3", "subject": "First Interview", "body": "x" * 6000, "from": "Jane <hr@globex.io>"},
+        ]
+    
+    def test_results_saved_and_reused(self, tmp_path, emails):
+        """Test saved classifications are applied in email order on the next run"""
+        cache_file = tmp_path / "cache.json"
+        classified = EmailClassifier().classify_emails(emails)
+        cache = ClassificationCache(cache_file)
+        cache.add(classified[::-1])
+        assert cache.save()
+        
+        reloaded = ClassificationCache(cache_file)
+        keys = [reloaded.key(email_data) for email_data in emails]
+        assert all(key in reloaded.results for key in keys)
+        assert reloaded.apply(emails, keys) == classified
+        assert reloaded.results[keys[0]][0] is sys.intern("offer")
+    
+    def test_key_depends_on_classified_fields(self, emails):
+        """Test only the subject, body preview and sender change the key"""
+        key = ClassificationCache.key(emails[2])
+        assert ClassificationCache.key({**emails[2], "id": "other"}) == key
+        assert ClassificationCache.key({**emails[2], "body": "x" * 5000 + "y"}) == key
+        assert ClassificationCache.key({**emails[2], "subject": "Second Interview"}) != key
+        assert ClassificationCache.key(emails[1]) != ClassificationCache.key({**emails[1], "body": "None"})
+    
+    def test_uncached_emails_skipped(self, tmp_path, emails):
+        """Test apply leaves out emails that were never classified"""
+        cache = ClassificationCache(tmp_path / "cache.json")
+        cache.add(EmailClassifier().classify_emails(emails[:1]))
+        keys = [cache.key(email_data) for email_data in emails]
+        assert [email_data["id"] for email_data in cache.apply(emails, keys)] == ["1"]
+    
+    @pytest.mark.parametrize("content", [b"not json", b'{"version": "old", "results": {"k": ["offer", 1.0, "Acme"]}}'])
+    def test_unusable_cache_ignored(self, tmp_path, content):
+        """Test a corrupt cache, or one from another classifier version, starts empty"""
+        cache_file = tmp_path / "cache.json"
+        cache_file.write_bytes(content)
+        assert ClassificationCache(cache_file).results == {}
+    
+    @pytest.mark.parametrize("results", [[], {"k": ["offer", 1.0]}, {"k": [None, 1.0, "Acme"]}, {"k": "offer"}])
+    def test_malformed_cache_ignored(self, tmp_path, results):
+        """Test a cache of the current version whose results have the wrong shape starts empty"""
+        cache_file = tmp_path / "cache.json"
+        version = ClassificationCache(cache_file).version
+        cache_file.write_bytes(orjson.dumps({"version": version, "results": results}))
+        assert ClassificationCache(cache_file).results == {}
+    
+    def test_save_prunes_unseen_emails(self, tmp_path, emails):
+        """Test saving with this run's keys drops results for emails no longer seen"""
+        cache_file = tmp_path / "cache.json"
+        cache = ClassificationCache(cache_file)
+        cache.add(EmailClassifier().classify_emails(emails))
+        keys = [cache.key(email_data) for email_data in emails[1:]]
+        assert cache.save(keys)
+        assert sorted(ClassificationCache(cache_file).results) == sorted(keys)
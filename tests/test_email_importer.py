@@ -0,0 +1,187 @@
+"""Tests for mbox email import"""
+
+import io
+import mailbox
+from contextlib import closing
+from email.header import Header
+from email.message import EmailMessage
+from email.utils import parsedate_to_datetime
+
+import pytest
+from src.email_importer import EmailImporter, _iter_mbox, _iter_mbox_mapped, _parse_date_value
+
+
+MBOX = (
+    b"preamble that is not part of any message\n"
+    b"From jane@acme.com Mon Feb  5 10:00:00 2024\n"
+    b"Subject: Application submitted\n"
+    b"From: Jane <jane@acme.com>\n"
+    b"Date: Mon, 5 Feb 2024 10:00:00 +0000\n"
+    b"Message-ID: <one@acme.com>\n"
+    b"\n"
+    b"Thank you for your application.\n"
+    b">From the hiring team\n"
+    b"\n"
+    b"From hr@globex.io Tue Feb  6 11:30:00 2024\n"
+    b"Subject: Interview\n"
+    b"Content-Type: text/html\n"
+    b"\n"
+    b"<p>Phone <b>screen</b></p>\n"
+    b"From hr@initech.com Wed Feb  7 09:00:00 2024\n"
+    b"Subject: No trailing newline\n"
+    b"\n"
+    b"body"
+)
+
+
+class TestEmailImporter:
+    """Test cases for EmailImporter"""
+    
+    @pytest.fixture
+    def mbox_path(self, tmp_path):
+        """Write a small mbox file"""
+        path = tmp_path / "mail.mbox"
+        path.write_bytes(MBOX)
+        return path
+    
+    @pytest.fixture
+    def importer(self, tmp_path):
+        """Create importer instance"""
+        return EmailImporter(input_dir=tmp_path)
+    
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_iter_mbox_matches_mailbox(self, mbox_path, chunk_size):
+        """Test messages are split exactly like mailbox.mbox, whatever the chunk size"""
+        with closing(mailbox.mbox(str(mbox_path))) as mbox:
+            expected = [message.as_bytes() for message in mbox]
+        split = list(_iter_mbox(io.BytesIO(MBOX), chunk_size))
+        
+        assert [mailbox.mboxMessage(raw).as_bytes() for raw, _ in split] == expected
+        assert split[-1][1] == len(MBOX)
+    
+    @pytest.mark.parametrize("data", [MBOX, MBOX.split(b"\n", 1)[1], b"no messages\n"])
+    def test_iter_mbox_mapped_matches_mailbox(self, tmp_path, data):
+        """Test splitting a mapped file matches mailbox.mbox, with or without a preamble"""
+        path = tmp_path / "mapped.mbox"
+        path.write_bytes(data)
+        with closing(mailbox.mbox(str(path))) as mbox:
+            expected = [message.as_bytes() for message in mbox]
+        split = list(_iter_mbox_mapped(data))
+        
+        assert [mailbox.mboxMessage(raw).as_bytes() for raw, _ in split] == expected
+        if split:
+            assert split[-1][1] == len(data)
+    
+    def test_import_from_mbox(self, importer, mbox_path):
+        """Test parsed email fields"""
+        emails = importer.import_from_mbox(mbox_path)
+        assert len(emails) == 3
+        assert emails[0]["id"] == "<one@acme.com>"
+        assert emails[0]["subject"] == "Application submitted"
+        assert emails[0]["from"] == "Jane <jane@acme.com>"
+        assert emails[0]["date"].isoformat() == "2024-02-05T10:00:00+00:00"
+        assert emails[0]["body"] == "Thank you for your application.\n>From the hiring team\n"
+        assert emails[1]["body"] == "Phone screen"
+        assert emails[2]["body"] == "body"
+    
+    @pytest.mark.parametrize("mapped", [True, False])
+    def test_import_from_mbox_in_workers(self, importer, mbox_path, monkeypatch, mapped):
+        """Test parsing in worker processes keeps the messages and their order, sending offsets or messages"""
+        expected = importer.import_from_mbox(mbox_path, workers=1)
+        monkeypatch.setattr("src.email_importer.PARSE_BATCH_SIZE", 1)
+        monkeypatch.setattr("src.email_importer.MBOX_RELEASE_BYTES", 1)
+        monkeypatch.setattr("src.email_importer.PARALLEL_MIN_BYTES", 0)
+        if not mapped:
+            monkeypatch.setattr("src.email_importer._map_mbox", lambda mbox_file: None)
+        assert importer.import_from_mbox(mbox_path, workers=2) == expected
+    
+    def test_small_mbox_parsed_without_workers(self, importer, mbox_path, monkeypatch):
+        """Test an mbox file below PARALLEL_MIN_BYTES never starts a process pool"""
+        expected = importer.import_from_mbox(mbox_path, workers=1)
+        
+        def no_pool(*args, **kwargs):
+            raise AssertionError("process pool started for a small mbox file")
+        
+        monkeypatch.setattr("src.email_importer.ProcessPoolExecutor", no_pool)
+        assert importer.import_from_mbox(mbox_path, workers=2) == expected
+    
+    def test_import_releasing_parsed_pages(self, importer, mbox_path, monkeypatch):
+        """Test releasing parsed pages after every message does not change the result"""
+        expected = importer.import_from_mbox(mbox_path)
+        monkeypatch.setattr("src.email_importer.MBOX_RELEASE_BYTES", 1)
+        assert importer.import_from_mbox(mbox_path) == expected
+    
+    def test_import_empty_mbox(self, importer, tmp_path):
+        """Test an empty mbox file imports nothing"""
+        path = tmp_path / "empty.mbox"
+        path.write_bytes(b"")
+        assert importer.import_from_mbox(path) == []
+    
+    def test_decode_header_values(self, importer):
+        """Test encoded, repeated and Header-object header values decode the same"""
+        encoded = "=?utf-8?q?Caf=C3=A9_Recruiting?= <jobs@cafe.com>"
+        assert importer._decode_header(encoded) == "Café Recruiting <jobs@cafe.com>"
+        assert importer._decode_header(encoded) == "Café Recruiting <jobs@cafe.com>"
+        assert importer._decode_header(Header("Plain subject")) == "Plain subject"
+        assert importer._decode_header("") == ""
+    
+    def test_extract_body_multipart(self, importer):
+        """Test the first plain text part is the body and HTML is only a fallback"""
+        msg = EmailMessage()
+        msg.set_content("Plain body")
+        msg.add_alternative("<p>HTML body</p>", subtype="html")
+        msg.add_attachment("notes", filename="notes.txt")
+        assert importer._extract_body(msg) == "Plain body\n"
+        
+        html_only = EmailMessage()
+        html_only.set_content("<p>HTML <b>body</b></p>", subtype="html")
+        html_only.add_attachment(b"data", maintype="application", subtype="octet-stream")
+        assert importer._extract_body(html_only) == "HTML body"
+    
+    def test_auto_import_skips_settings_folders(self, importer, tmp_path):
+        """Test nested .mbox files are found and settings folders are not imported"""
+        mail_dir = tmp_path / "Takeout" / "Mail"
+        settings_dir = mail_dir / "User Settings"
+        settings_dir.mkdir(parents=True)
+        (mail_dir / "Inbox.mbox").write_bytes(MBOX)
+        (settings_dir / "Filters.mbox").write_bytes(MBOX)
+        (tmp_path / "Folder.mbox").mkdir()
+        
+        assert list(importer._walk_mbox(tmp_path)) == [mail_dir / "Inbox.mbox"]
+        assert len(importer.auto_import()) == 3
+    
+    def test_walk_mbox_skips_linked_duplicates(self, importer, tmp_path):
+        """Test an mbox file reachable under two names is imported once"""
+        (tmp_path / "Inbox.mbox").write_bytes(MBOX)
+        (tmp_path / "Copy.mbox").symlink_to(tmp_path / "Inbox.mbox")
+        
+        assert len(list(importer._walk_mbox(tmp_path))) == 1
+    
+    def test_extract_body_uses_declared_charset(self, importer):
+        """Test payloads are decoded with their Content-Type charset"""
+        msg = EmailMessage()
+        msg.set_content("Café à Paris", charset="iso-8859-1", cte="8bit")
+        assert importer._extract_body(msg) == "Café à Paris\n"
+        
+        msg.set_param("charset", "x-unknown")
+        assert importer._extract_body(msg) == "Caf  Paris\n"
+    
+    @pytest.mark.parametrize("date_str", [
+        "Mon, 5 Feb 2024 10:00:00 +0000",
+        "Tue, 06 Feb 2024 23:59:59 -0530 (EST)",
+        "6 feb 2024 01:02:03 +0100",
+        "Mon, 5 Feb 2024 10:00:00 -0000",
+        "Mon, 5 Feb 2024 10:00:00 GMT",
+        "Mon, 5 Feb 24 10:00 +0000",
+    ])
+    def test_parse_date_matches_parsedate_to_datetime(self, date_str):
+        """Test the fast date path gives the same datetime and time zone as the email package"""
+        expected = parsedate_to_datetime(date_str)
+        parsed = _parse_date_value(date_str)
+        assert parsed == expected
+        assert parsed.utcoffset() == expected.utcoffset()
+    
+    def test_parse_date_invalid(self):
+        """Test malformed and impossible dates parse to None"""
+        assert _parse_date_value("not a date") is None
+        assert _parse_date_value("Mon, 31 Feb 2024 10:00:00 +0000") is None
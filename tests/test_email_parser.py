@@ -0,0 +1,194 @@
+"""Tests for IMAP email parsing"""
+
+import pytest
+from src.email_parser import EmailParser
+from src.email_storage import EmailStorage
+
+
+def raw_email(num):
+    """Build a small raw RFC 822 message"""
+    return (
+        f"Subject: Application {num}\r\n"
+        f"From: Jobs <jobs@acme.com>\r\n"
+        f"Date: Mon, 5 Feb 2024 10:00:00 +0000\r\n"
+        f"\r\n"
+        f"Thank you for applying ({num}).\r\n"
+    ).encode()
+
+
+class FakeIMAP:
+    """Answers UID SEARCH and UID FETCH like imaplib.IMAP4, recording the FETCH commands"""
+
+    def __init__(self, count, missing=(), esearch=False, uid_last=False):
+        # UIDs differ from message numbers, as they do after messages are expunged
+        self.uids = list(range(101, 101 + count))
+        self.missing = set(missing)
+        self.capabilities = ("IMAP4REV1", "ESEARCH") if esearch else ("IMAP4REV1",)
+        self.uid_last = uid_last
+        self.fetches = []
+        self.searches = []
+        self.untagged = {}
+
+    def select(self, mailbox):
+        return "OK", [str(len(self.uids)).encode()]
+
+    def response(self, code):
+        return code, self.untagged.pop(code, [None])
+
+    def uid(self, command, *args):
+        if command == "SEARCH":
+            self.searches.append(args[-1])
+            if args[:2] == ("RETURN", "(ALL)"):
+                ranges = b"%d:%d" % (self.uids[0], self.uids[-1]) if self.uids else b""
+                self.untagged["ESEARCH"] = [b'(TAG "A3") UID' + (b" ALL " + ranges if ranges else b"")]
+                return "OK", [None]
+            return "OK", [b" ".join(str(uid).encode() for uid in self.uids)]
+
+        message_set, message_parts = args
+        assert command == "FETCH"
+        assert message_parts == "(UID BODY.PEEK[])"
+        self.fetches.append(message_set)
+        data = []
+        for uid in message_set.split(b","):
+            seq = self.uids.index(int(uid)) + 1
+            if int(uid) in self.missing:
+                continue
+            raw = raw_email(int(uid))
+            if self.uid_last:
+                data.append((b"%d (BODY[] {%d}" % (seq, len(raw)), raw))
+                data.append(b" UID " + uid + b")")
+            else:
+                data.append((b"%d (UID %s BODY[] {%d}" % (seq, uid, len(raw)), raw))
+                data.append(b")")
+        return "OK", data
+
+
+class TestEmailParser:
+    """Test cases for EmailParser"""
+
+    @pytest.fixture
+    def parser(self):
+        """Create parser instance"""
+        return EmailParser(email_address="me@example.com", password="secret")
+
+    def test_fetch_emails_in_batches(self, parser, monkeypatch):
+        """Test messages are fetched in batches and parsed in order"""
+        monkeypatch.setattr("src.email_parser.FETCH_BATCH_SIZE", 2)
+        parser.imap = FakeIMAP(5)
+
+        emails = parser.fetch_emails(workers=1)
+
+        assert parser.imap.fetches == [b"101,102", b"103,104", b"105"]
+        assert [email["id"] for email in emails] == ["uid:101", "uid:102", "uid:103", "uid:104", "uid:105"]
+        assert emails[0]["subject"] == "Application 101"
+        assert emails[0]["from"] == "Jobs <jobs@acme.com>"
+        assert emails[0]["date"].isoformat() == "2024-02-05T10:00:00+00:00"
+        assert emails[0]["body"] == "Thank you for applying (101).\r\n"
+
+    def test_fetch_emails_in_workers(self, parser, monkeypatch):
+        """Test parsing in worker processes keeps the emails and their order"""
+        monkeypatch.setattr("src.email_parser.FETCH_BATCH_SIZE", 2)
+        parser.imap = FakeIMAP(7, missing={104})
+        expected = parser.fetch_emails(workers=1)
+
+        parser.imap = FakeIMAP(7, missing={104})
+        assert parser.fetch_emails(workers=2) == expected
+
+    def test_fetch_emails_skips_missing_messages(self, parser):
+        """Test a message missing from the FETCH response is skipped"""
+        parser.imap = FakeIMAP(3, missing={102})
+        assert [email["id"] for email in parser.fetch_emails()] == ["uid:101", "uid:103"]
+
+    @pytest.mark.parametrize("esearch", [False, True])
+    @pytest.mark.parametrize("uid_last", [False, True])
+    def test_fetch_emails_by_uid(self, parser, esearch, uid_last):
+        """Test messages are found by UID with or without ESEARCH, wherever FETCH puts the UID"""
+        parser.imap = FakeIMAP(3, esearch=esearch, uid_last=uid_last)
+        assert [email["id"] for email in parser.fetch_emails()] == ["uid:101", "uid:102", "uid:103"]
+
+    def test_fetch_emails_append_to_sequence_number_store(self, parser, tmp_path, monkeypatch):
+        """Test UIDs never collide with the sequence-number IDs older versions saved"""
+        monkeypatch.setattr("src.email_storage.INPUT_DIR", tmp_path)
+        storage = EmailStorage()
+        storage.save_emails([{"id": "101", "subject": "Saved by sequence number"}])
+
+        parser.imap = FakeIMAP(2)
+        storage.save_emails(parser.fetch_emails(), overwrite=False)
+        assert [email["id"] for email in storage.load_emails()] == ["101", "uid:101", "uid:102"]
+
+    def test_fetch_emails_esearch_no_matches(self, parser):
+        """Test an ESEARCH reply without ALL means no messages matched"""
+        parser.imap = FakeIMAP(0, esearch=True)
+        assert parser.fetch_emails() == []
+        assert parser.imap.fetches == []
+
+    def test_expand_sequence_set(self, parser):
+        """Test ranges in a sequence set are expanded in order"""
+        assert parser._expand_sequence_set(b"1:3,7,10:9") == [b"1", b"2", b"3", b"7", b"9", b"10"]
+
+    def test_fetch_emails_limit(self, parser):
+        """Test only the first messages up to the limit are fetched"""
+        parser.imap = FakeIMAP(5)
+        assert len(parser.fetch_emails(limit=2)) == 2
+
+    def test_extract_text_from_html(self, parser):
+        """Test HTML bodies are reduced to their visible text"""
+        html = "<html><body><p>Hi <b>there</b></p><script>track()</script>Thanks</body></html>"
+        assert parser._extract_text_from_html(html) == "Hi there Thanks"
+        assert parser._extract_text_from_html("") == ""
+
+    def test_decode_header(self, parser):
+        """Test encoded and repeated headers decode to the same text"""
+        encoded = "=?utf-8?q?Caf=C3=A9?= Recruiting"
+        assert parser._decode_header(encoded) == "Café Recruiting"
+        assert parser._decode_header(encoded) == "Café Recruiting"
+        assert parser._decode_header("") == ""
+
+    def test_parse_body_charset(self, parser):
+        """Test bodies are decoded with the charset their part declares"""
+        raw = (
+            b"Subject: Vaga\r\n"
+            b"Content-Type: text/plain; charset=iso-8859-1\r\n"
+            b"\r\n"
+            b"Candidatura recebida, obrigado. Ol\xe1!\r\n"
+        )
+        assert parser._parse_message(b"1", raw)["body"] == "Candidatura recebida, obrigado. Olá!\r\n"
+
+    def test_parse_body_unknown_charset(self, parser):
+        """Test an unknown charset name falls back to UTF-8"""
+        raw = (
+            b"Content-Type: text/plain; charset=x-unknown\r\n"
+            b"\r\n"
+            b"Caf\xc3\xa9\r\n"
+        )
+        assert parser._parse_message(b"1", raw)["body"] == "Café\r\n"
+
+    def test_parse_body_prefers_plain_text(self, parser):
+        """Test the first plain text part is the body and HTML is only a fallback"""
+        alternative = (
+            b"Content-Type: multipart/alternative; boundary=b\r\n"
+            b"\r\n"
+            b"--b\r\nContent-Type: text/html\r\n\r\n<p>Hello <b>html</b></p>\r\n"
+            b"--b\r\nContent-Type: text/plain\r\n\r\nHello plain\r\n"
+            b"--b\r\nContent-Type: text/plain\r\n\r\nquoted thread\r\n"
+            b"--b--\r\n"
+        )
+        assert parser._parse_message(b"1", alternative)["body"] == "Hello plain"
+
+        html_only = alternative.replace(b"text/plain", b"text/csv")
+        assert parser._parse_message(b"1", html_only)["body"] == "Hello html"
+
+    def test_fetch_job_related_emails_query(self, parser):
+        """Test the keywords are combined with IMAP's two-key prefix OR"""
+        parser.imap = FakeIMAP(2)
+        assert len(parser.fetch_job_related_emails(keywords=["job", "hiring"])) == 2
+        assert parser.imap.searches == [
+            '(OR (OR BODY "job" BODY "hiring") (OR SUBJECT "job" SUBJECT "hiring"))'
+        ]
+
+    def test_or_search_query(self, parser):
+        """Test any number of keys nest into one balanced query"""
+        assert parser._or_search_query(['TEXT "a"']) == 'TEXT "a"'
+        assert parser._or_search_query(['TEXT "a"', 'TEXT "b"', 'TEXT "c"']) == (
+            '(OR TEXT "a" (OR TEXT "b" TEXT "c"))'
+        )
@@ -0,0 +1,168 @@
+"""Tests for email storage"""
+
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from src.email_storage import EmailStorage, _iter_email_list
+
+
+class TestEmailStorage:
+    """Test cases for EmailStorage"""
+
+    @pytest.fixture
+    def storage(self, tmp_path, monkeypatch):
+        """Create storage writing to a temporary input folder"""
+        monkeypatch.setattr("src.email_storage.INPUT_DIR", tmp_path)
+        return EmailStorage()
+
+    @pytest.fixture
+    def emails(self):
+        """Create a couple of emails"""
+        return [
+            {"id": "<one@acme.com>", "subject": "Café \"interview\"", "body": "line 1\nline 2",
+             "date": datetime(2024, 2, 5, 10, tzinfo=timezone.utc)},
+            {"id": "<two@globex.io>", "subject": "Update", "body": "", "date": None},
+        ]
+
+    def test_save_emails_from_generator(self, storage, emails):
+        """Test emails are streamed to an indented JSON file that round-trips"""
+        assert storage.save_emails(email for email in emails)
+
+        text = storage.storage_file.read_text(encoding="utf-8")
+        data = json.loads(text)
+        assert text == json.dumps(data, indent=2, ensure_ascii=False)
+        assert data["metadata"]["total_emails"] == 2
+        assert data["emails"][0]["date"] == "2024-02-05T10:00:00+00:00"
+        assert data["emails"][1] == emails[1]
+        assert emails[0]["date"] == datetime(2024, 2, 5, 10, tzinfo=timezone.utc)
+
+    def test_save_no_emails(self, storage):
+        """Test an empty email list is saved as valid JSON"""
+        assert storage.save_emails([])
+        assert json.loads(storage.storage_file.read_text(encoding="utf-8"))["emails"] == []
+
+    def test_append_skips_existing_ids(self, storage, emails):
+        """Test appending only adds emails whose ID is not already saved"""
+        storage.save_emails(emails[:1])
+        storage.save_emails(emails, overwrite=False)
+
+        data = json.loads(storage.storage_file.read_text(encoding="utf-8"))
+        assert [email["id"] for email in data["emails"]] == ["<one@acme.com>", "<two@globex.io>"]
+        assert data["metadata"]["total_emails"] == 2
+
+    def test_append_same_emails_skips_write(self, storage, emails):
+        """Test appending exactly the saved emails leaves the file as it was"""
+        storage.save_emails(emails)
+        before = storage.storage_file.read_bytes()
+
+        assert storage.save_emails(emails[::-1], overwrite=False)
+        assert storage.storage_file.read_bytes() == before
+
+        # A subset is a different set of IDs, so the file is rewritten with nothing added
+        assert storage.save_emails(emails[:1], overwrite=False)
+        assert storage.get_metadata()["total_emails"] == 2
+
+    def test_failed_save_keeps_previous_file(self, storage, emails):
+        """Test a save that fails part way leaves the previous file intact"""
+        storage.save_emails(emails)
+        before = storage.storage_file.read_text(encoding="utf-8")
+
+        assert not storage.save_emails(emails + [{"id": "bad", "body": object()}])
+        assert storage.storage_file.read_text(encoding="utf-8") == before
+        assert list(storage.storage_file.parent.iterdir()) == [storage.storage_file]
+
+    def test_load_emails_round_trip(self, storage, emails):
+        """Test saved emails load back with their dates parsed"""
+        storage.save_emails(emails)
+
+        assert storage.load_emails() == emails
+
+    @pytest.mark.parametrize("indent", [2, 4, None])
+    def test_load_emails_metadata_first(self, storage, indent):
+        """Test files written with metadata before the email list, or in other layouts, still load"""
+        storage.storage_file.write_text(json.dumps({
+            "metadata": {"total_emails": 1, "source": "email_fetch"},
+            "emails": [{"id": "1", "date": "2024-02-05T10:00:00Z", "score": -1.5e-3}],
+        }, indent=indent), encoding="utf-8")
+
+        loaded = storage.load_emails()
+        assert loaded == [{"id": "1", "date": datetime(2024, 2, 5, 10, tzinfo=timezone.utc), "score": -1.5e-3}]
+
+    def test_email_list_streamed(self):
+        """Test emails of an indented file are decoded one at a time, nested values and all"""
+        emails = [
+            {"id": "1", "subject": '\n    }', "to": ["a@acme.com", "b@acme.com"], "headers": {"x": [{}]}},
+            {},
+            {"id": "3", "body": "]\n  ]"},
+        ]
+        f = io.BytesIO(json.dumps({"emails": emails, "metadata": {"total_emails": 3}}, indent=2).encode())
+
+        loaded = _iter_email_list(f)
+        assert next(loaded) == emails[0]
+        assert f.tell() < len(f.getvalue())
+        assert list(loaded) == emails[1:]
+
+    def test_load_truncated_indented_file(self, storage, emails):
+        """Test an indented file cut off after whole emails is reported, not loaded in part"""
+        storage.save_emails(emails)
+        text = storage.storage_file.read_text(encoding="utf-8")
+        storage.storage_file.write_text(text[:text.index("\n  ]")], encoding="utf-8")
+        assert storage.load_emails() is None
+
+    def test_load_emails_by_year(self, storage, emails):
+        """Test the year filter drops other years and undated emails"""
+        storage.save_emails(emails)
+        assert [email["id"] for email in storage.load_emails(year=2024)] == ["<one@acme.com>"]
+        assert storage.load_emails(year=2023) == []
+
+    def test_load_emails_by_months(self, storage):
+        """Test the months cutoff applies to dates saved with and without a UTC offset"""
+        now = datetime.now()
+        storage.save_emails([
+            {"id": "recent-utc", "date": datetime.now(timezone.utc)},
+            {"id": "recent-naive", "date": now},
+            {"id": "old-utc", "date": datetime(2001, 1, 1, tzinfo=timezone.utc)},
+            {"id": "old-naive", "date": datetime(2001, 1, 1)},
+        ])
+        assert [email["id"] for email in storage.load_emails(months=1)] == ["recent-utc", "recent-naive"]
+
+    def test_get_metadata(self, storage, emails):
+        """Test the metadata is read from saved files"""
+        assert storage.get_metadata() is None
+        storage.save_emails(emails)
+        metadata = storage.get_metadata()
+        assert metadata["total_emails"] == 2
+        assert metadata["source"] == "email_fetch"
+
+    @pytest.mark.parametrize("indent", [2, None])
+    def test_get_metadata_other_layouts(self, storage, indent):
+        """Test metadata before the emails and unindented files are read too"""
+        metadata = {"total_emails": 1, "source": "email_fetch"}
+        storage.storage_file.write_text(json.dumps(
+            {"metadata": metadata, "emails": [{"id": "1", "subject": '\n  "metadata": {}'}]},
+            indent=indent,
+        ), encoding="utf-8")
+        assert storage.get_metadata() == metadata
+
+    def test_load_missing_file(self, storage):
+        """Test loading before anything was saved returns None"""
+        assert storage.load_emails() is None
+
+    def test_jsonl_storage(self, tmp_path, monkeypatch, emails):
+        """Test a .jsonl storage file holds one email per line and round-trips"""
+        monkeypatch.setattr("src.email_storage.INPUT_DIR", tmp_path)
+        storage = EmailStorage("emails.jsonl")
+        assert storage.save_emails(email for email in emails[:1])
+        assert storage.save_emails(emails, overwrite=False)
+
+        lines = storage.storage_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ["<one@acme.com>", "<two@globex.io>"]
+        assert storage.load_emails() == emails
+        assert storage.get_metadata() is None
+
+    def test_load_invalid_json(self, storage):
+        """Test a truncated file is reported instead of raising"""
+        storage.storage_file.write_text('{"emails": [{"id": "1"}, {"id"', encoding="utf-8")
+        assert storage.load_emails() is None
@@ -0,0 +1,34 @@
+"""Tests for HTML-to-text extraction"""
+
+import pytest
+from bs4 import BeautifulSoup
+from src.html_text import html_to_text
+
+
+class TestHtmlToText:
+    """Test cases for html_to_text"""
+
+    @pytest.mark.parametrize("html", [
+        "<html><body><p>Hi <b>there</b></p><script>x=1</script> tail &amp; more</body></html>",
+        "<p>a<!-- comment -->b</p><style>.a{}</style><template><p>hidden</p></template>after",
+        "<!DOCTYPE html><html><head><title>Title</title></head><body>B&nbsp;c</body></html>",
+        "<p>unclosed <div>nested<span>deep",
+        "<html><body><p>one</p></body></html><p>after html</p>",
+        "<div>" * 500 + "deep" + "</div>" * 500,
+        "plain text",
+        "",
+    ])
+    def test_matches_beautifulsoup(self, html):
+        """Test the text matches BeautifulSoup's get_text"""
+        expected = BeautifulSoup(html, "lxml").get_text(separator=" ", strip=True)
+        assert html_to_text(html) == expected
+
+    def test_hidden_text_skipped(self):
+        """Test script, style and template contents are dropped but their tails kept"""
+        html = "<p>Hi</p><script>var x;</script>after script<style>p{}</style>after style"
+        assert html_to_text(html) == "Hi after script after style"
+
+    def test_parser_reused_across_documents(self):
+        """Test an unclosed hidden tag does not leak into the next document"""
+        assert html_to_text("<p>one<script>hidden") == "one"
+        assert html_to_text("<p>two</p>") == "two"
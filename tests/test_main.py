@@ -0,0 +1,111 @@
+"""Tests for the main entry point's helpers"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from src.main import filter_emails_by_date, main
+
+
+class TestFilterEmailsByDate:
+    """Test cases for filter_emails_by_date"""
+
+    @pytest.fixture
+    def emails(self):
+        """Create emails dated around a new year in other time zones, recently, and not at all"""
+        recent = datetime.now(timezone.utc) - timedelta(days=3)
+        return [
+            {"id": "new-year-east", "date": "2024-01-01T00:30:00+02:00"},
+            {"id": "new-year-west", "date": "2023-12-31T23:30:00-02:00"},
+            {"id": "2024-object", "date": datetime(2024, 1, 1, 0, 30, tzinfo=timezone(timedelta(hours=2)))},
+            {"id": "2024-naive", "date": datetime(2024, 6, 1)},
+            {"id": "recent-string", "date": recent.isoformat()},
+            {"id": "recent-object", "date": recent},
+            {"id": "invalid", "date": "2024-not-a-date"},
+            {"id": "undated", "date": None},
+        ]
+
+    @staticmethod
+    def ids(emails):
+        """IDs of the emails, in order"""
+        return [email_data["id"] for email_data in emails]
+
+    @pytest.mark.parametrize("months", [None, 12 * 100])
+    def test_year_is_local_year(self, emails, months):
+        """Test a date's own year is used, with or without a months filter"""
+        assert self.ids(filter_emails_by_date(emails, months=months, year=2024)) == [
+            "new-year-east", "2024-object", "2024-naive",
+        ]
+        assert self.ids(filter_emails_by_date(emails, months=months, year=2023)) == ["new-year-west"]
+
+    def test_year_without_parsing(self, emails, monkeypatch):
+        """Test a year alone is checked on the strings, without parsing any date"""
+        def no_parse(*args, **kwargs):
+            raise AssertionError("dates parsed for a year filter")
+
+        monkeypatch.setattr("pandas.to_datetime", no_parse)
+        emails.append({"id": "short", "date": "2024-1"})
+        assert self.ids(filter_emails_by_date(emails, year=2024)) == ["new-year-east", "2024-object", "2024-naive"]
+
+    def test_months(self, emails):
+        """Test only dates within the last months are kept"""
+        assert self.ids(filter_emails_by_date(emails, months=1)) == ["recent-string", "recent-object"]
+
+    def test_no_filter(self, emails):
+        """Test every email is kept without a filter"""
+        assert filter_emails_by_date(emails) == emails
+        assert filter_emails_by_date([], year=2024) == []
+
+    @pytest.fixture
+    def run_main(self, emails, monkeypatch, tmp_path):
+        """Run main on the emails as if fetched, returning the emails it analyzed"""
+        analyzed = []
+
+        class FakeAnalytics:
+            def __init__(self, classified_emails):
+                analyzed.extend(classified_emails)
+
+            def save_analytics(self):
+                return {key: 0 for key in (
+                    "total_applications", "rejected_count", "offers_count", "accepted_count",
+                    "interviews_count", "withdrew_count", "no_reply_count", "total_companies",
+                    "accuracy_percentage",
+                )}
+
+        monkeypatch.setattr("src.main.ensure_dirs", lambda: None)
+        monkeypatch.setattr("src.main.fetch_emails_from_server", lambda: emails)
+        monkeypatch.setattr("src.classifier.CLASSIFICATION_CACHE", tmp_path / "cache.json")
+        monkeypatch.setattr("src.analytics.AnalyticsGenerator", FakeAnalytics)
+
+        def run(*args):
+            analyzed.clear()
+            monkeypatch.setattr("sys.argv", ["main", "--no-save", *args])
+            main()
+            return analyzed
+
+        return run
+
+    def test_main_filters_fetched_emails(self, run_main):
+        """Test --year limits the fetched emails that are classified and analyzed"""
+        assert self.ids(run_main("--year", "2024")) == ["new-year-east", "2024-object", "2024-naive"]
+
+    def test_date_filtered_run_keeps_cache(self, emails, run_main, tmp_path):
+        """Test a date filtered run keeps cached results for other years, and a full run prunes them"""
+        from src.classifier import ClassificationCache
+
+        def keys():
+            return set(ClassificationCache(tmp_path / "cache.json").results)
+
+        gone = {"subject": "Deleted long ago", "body": "", "from": ""}
+        run_main()
+        cache = ClassificationCache(tmp_path / "cache.json")
+        cache.results[cache.key(gone)] = ["applied", 0.5, "Acme"]
+        cache.save()
+
+        run_main("--year", "2024")
+        assert keys() == {ClassificationCache.key(email_data) for email_data in emails + [gone]}
+
+        run_main("--year", "2023")
+        assert ClassificationCache.key(gone) in keys()
+
+        run_main()
+        assert keys() == {ClassificationCache.key(email_data) for email_data in emails}